@@ -1,26 +1,173 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer
+import secrets
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.core.security import verify_token
-from app.services.user_service import get_user_by_username
+from app.core import sharding
+from app.core.config import settings
+from app.core.database import get_async_db, get_db
+from app.core.replicas import read_session
+from app.core.security import STREAM_SCOPE, verify_token
+from app.services import async_user_service
+from app.services.shard_service import resolve_shard, shard_session
+from app.services.user_service import (
+    cache_user,
+    get_cached_user,
+    get_user_by_username,
+)
 
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+
+def _verify_token(token: str, scope: Optional[str] = None) -> str:
+    username = verify_token(token, scope=scope)
+    if username is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return username
+
+
+def _check_active(user):
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Inactive user")
+    return user
 
 
 def get_current_user(
     credentials: HTTPBearer = Depends(security), db: Session = Depends(get_db)
 ):
-    username = verify_token(credentials.credentials)
-    if username is None:
+    return _load_user(db, _verify_token(credentials.credentials))
+
+
+def get_stream_user(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db),
+):
+    """Current user from the Authorization header or a ``token`` parameter.
+
+    Browsers' EventSource cannot send headers, so the change feed also takes a
+    stream token (see ``POST /tasks/stream/token``) in its URL.
+    """
+    if credentials is not None:
+        username = _verify_token(credentials.credentials)
+    elif token is not None:
+        username = _verify_token(token, scope=STREAM_SCOPE)
+    else:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _load_user(db, username)
+
+
+def require_internal_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+):
+    """Guard for operational endpoints, which don't exist without INTERNAL_TOKEN."""
+    expected = settings.INTERNAL_TOKEN
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials.encode(), expected.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid internal token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+def _load_user(db: Session, username: str):
+    cached = get_cached_user(username)
+    if cached is not None:
+        return _check_active(cached)
     user = get_user_by_username(db, username=username)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return _check_active(cache_user(user))
+
+
+async def get_current_user_async(
+    credentials: HTTPBearer = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+):
+    username = _verify_token(credentials.credentials)
+    cached = get_cached_user(username)
+    if cached is not None:
+        return _check_active(cached)
+    user = await async_user_service.get_user_by_username(db, username=username)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return _check_active(cache_user(user))
+
+
+def get_shard_db(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Session on the shard holding the current user's tasks.
+
+    Without ``SHARD_URLS`` this is the request's primary session. Writes are
+    refused with 503 while the user's tasks are being moved between shards.
+    """
+    yield from _shard_db(request, db, current_user)
+
+
+def get_stream_db(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_stream_user),
+):
+    """:func:`get_shard_db` for the user authenticated by :func:`get_stream_user`."""
+    yield from _shard_db(request, db, current_user)
+
+
+def _shard_db(request: Request, db: Session, current_user):
+    if not sharding.shards.enabled:
+        yield db
+        return
+    name, moving = resolve_shard(db, current_user.id)
+    if moving and request.method not in ("GET", "HEAD"):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tasks are being moved, retry shortly",
+            headers={"Retry-After": "5"},
+        )
+    shard_db = shard_session(db, name)
+    try:
+        yield shard_db
+    finally:
+        if shard_db is not db:
+            shard_db.close()
+
+
+def get_read_db(
+    db: Session = Depends(get_shard_db), current_user=Depends(get_current_user)
+):
+    """Session for read-only endpoints: a read replica when one may serve them.
+
+    Replicas mirror the primary, so this only applies to users whose tasks are
+    there. Falls back to ``db`` when no replica is healthy or the current user
+    wrote recently (read-your-writes).
+    """
+    replica = None
+    if db.info.get("shard", sharding.DEFAULT_SHARD) == sharding.DEFAULT_SHARD:
+        replica = read_session(current_user.id)
+    if replica is None:
+        yield db
+        return
+    try:
+        yield replica
+    finally:
+        replica.close()
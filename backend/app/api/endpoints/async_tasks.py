@@ -0,0 +1,90 @@
+"""Task endpoints served from an AsyncSession when ``ASYNC_DATABASE`` is on."""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.dependencies import get_current_user_async
+from app.api.etag import cache_headers, etag_matches, make_etag, not_modified
+from app.api.responses import FastJSONResponse
+from app.core.database import get_async_db
+from app.core.pagination import InvalidCursor
+from app.models.user import User
+from app.schemas.task import TaskCreate, TaskQuery, TaskResponse, TaskUpdate
+from app.services.async_task_service import (
+    create_task,
+    delete_task,
+    get_task_rows,
+    get_task_version,
+    update_task,
+)
+from app.services.task_service import task_cursor
+
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[TaskResponse])
+async def read_tasks(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    filters: TaskQuery = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    version = await get_task_version(db, current_user.id)
+    etag = make_etag(current_user.id, version, request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    headers = cache_headers(etag)
+    try:
+        rows = await get_task_rows(
+            db,
+            user_id=current_user.id,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            filters=filters,
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if limit > 0 and len(rows) == limit:
+        headers["X-Next-Cursor"] = task_cursor(rows[-1], filters)
+    return FastJSONResponse([row._asdict() for row in rows], headers=headers)
+
+
+@router.post("/", response_model=TaskResponse)
+async def create_new_task(
+    task: TaskCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    return await create_task(db=db, task=task, user_id=current_user.id)
+
+
+@router.put("/{task_id}", response_model=TaskResponse)
+async def update_existing_task(
+    task_id: int,
+    task_update: TaskUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    db_task = await update_task(
+        db, task_id=task_id, task_update=task_update, user_id=current_user.id
+    )
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return db_task
+
+
+@router.delete("/{task_id}")
+async def delete_existing_task(
+    task_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    db_task = await delete_task(db, task_id=task_id, user_id=current_user.id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {"message": "Task deleted successfully"}
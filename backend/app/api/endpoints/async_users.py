@@ -0,0 +1,52 @@
+"""User endpoints served from an AsyncSession when ``ASYNC_DATABASE`` is on."""
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.dependencies import get_current_user_async
+from app.api.endpoints.users import registration_conflict_detail
+from app.core.database import get_async_db
+from app.schemas.user import Token, UserCreate, UserResponse
+from app.services.async_user_service import (
+    authenticate_user,
+    create_user,
+    get_user_by_username_or_email,
+)
+from app.services.token_service import issue_tokens
+
+
+router = APIRouter()
+
+
+@router.post("/register", response_model=UserResponse)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await get_user_by_username_or_email(
+        db, username=user.username, email=user.email
+    )
+    if existing:
+        raise HTTPException(
+            status_code=400, detail=registration_conflict_detail(existing, user)
+        )
+    try:
+        return await create_user(db=db, user=user)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400, detail="Username or email already registered"
+        )
+
+
+@router.post("/login", response_model=Token)
+async def login(username: str, password: str, db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user(db, username, password)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+        )
+    return await db.run_sync(issue_tokens, user)
+
+
+@router.get("/me", response_model=UserResponse)
+async def read_users_me(current_user: UserResponse = Depends(get_current_user_async)):
+    return current_user
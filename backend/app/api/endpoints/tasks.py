@@ -1,12 +1,71 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import io
+from typing import List, Literal, Optional
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
-from app.api.dependencies import get_current_user
-from app.core.database import get_db
+from app.api.dependencies import (
+    get_current_user,
+    get_read_db,
+    get_shard_db,
+    get_stream_db,
+    get_stream_user,
+    security,
+)
+from app.api.etag import cache_headers, etag_matches, make_etag, not_modified
+from app.api.responses import FastJSONResponse
+from app.core.config import settings
+from app.core.events import change_feed, format_sse
+from app.core.pagination import InvalidCursor, encode_cursor
+from app.core.security import create_stream_token, decode_access_token
 from app.models.user import User
-from app.schemas.task import TaskCreate, TaskResponse, TaskUpdate
-from app.services.task_service import create_task, delete_task, get_tasks, update_task
+from app.schemas.task import (
+    StreamToken,
+    TaskBulkRequest,
+    TaskBulkResponse,
+    TaskChangesResponse,
+    TaskCreate,
+    TaskImportResult,
+    TaskQuery,
+    TaskResponse,
+    TaskStats,
+    TaskUpdate,
+)
+from app.services.task_io import (
+    EXPORT_MEDIA_TYPES,
+    PARSERS,
+    csv_chunks,
+    import_format,
+    ndjson_chunks,
+)
+from app.services.task_service import (
+    ChangesExpired,
+    bulk_apply,
+    create_task,
+    delete_task,
+    get_task_by_id,
+    get_task_changes,
+    get_task_rows,
+    get_task_stats,
+    get_task_version,
+    import_tasks,
+    iter_task_rows,
+    search_tasks,
+    task_cursor,
+    update_task,
+)
 
 
 router = APIRouter()
@@ -14,29 +73,266 @@ router = APIRouter()
 
 @router.get("/", response_model=List[TaskResponse])
 def read_tasks(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    filters: TaskQuery = Depends(),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    tasks = get_tasks(db, user_id=current_user.id, skip=skip, limit=limit)
-    return tasks
+    """List tasks, oldest first unless ``order_by`` says otherwise.
+
+    Pass the ``X-Next-Cursor`` header of a full page back as ``cursor`` to
+    fetch the next one; cursor pages cost the same however deep they are.
+    Send the returned ``ETag`` as ``If-None-Match`` to get a 304 while
+    nothing has changed.
+    """
+    etag = make_etag(current_user.id, get_task_version(db, current_user.id), request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    headers = cache_headers(etag)
+    try:
+        rows = get_task_rows(
+            db,
+            user_id=current_user.id,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            filters=filters,
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if limit > 0 and len(rows) == limit:
+        headers["X-Next-Cursor"] = task_cursor(rows[-1], filters)
+    # Rows already have TaskResponse's shape; returning them directly skips
+    # response_model validation, the bulk of the cost of a large page.
+    return FastJSONResponse([row._asdict() for row in rows], headers=headers)
+
+
+@router.get("/search", response_model=List[TaskResponse])
+def search_user_tasks(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_shard_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Ranked full-text search over task titles and descriptions."""
+    try:
+        rows = search_tasks(
+            db, user_id=current_user.id, q=q, limit=limit, cursor=cursor
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if len(rows) == limit:
+        last_task, last_score = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last_score, last_task.id)
+    return [task for task, _ in rows]
+
+
+@router.get("/stats", response_model=TaskStats)
+def read_task_stats(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Total, completed and pending counts, read from maintained counters."""
+    stats = get_task_stats(db, user_id=current_user.id)
+    etag = make_etag(current_user.id, stats["version"], request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+    return stats
+
+
+@router.get("/changes", response_model=TaskChangesResponse)
+def read_task_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_shard_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Tasks changed since version ``since``, including deletion tombstones.
+
+    Returns 410 once tombstones after ``since`` have been reaped; the client
+    must then refetch the full list and sync from the returned version.
+    """
+    try:
+        changes, version, has_more = get_task_changes(
+            db, user_id=current_user.id, since=since, limit=limit
+        )
+    except ChangesExpired as exc:
+        raise HTTPException(status_code=410, detail=str(exc))
+    return {"version": version, "has_more": has_more, "changes": changes}
+
+
+@router.get("/export")
+def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Stream every task of the current user as NDJSON or CSV, oldest first.
+
+    Rows are read from a streamed cursor and written out batch by batch, so
+    the export runs in constant memory however many tasks there are.
+    """
+    batches = iter_task_rows(db, user_id=current_user.id)
+    chunks = csv_chunks(batches) if format == "csv" else ndjson_chunks(batches)
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
+
+
+@router.post("/stream/token", response_model=StreamToken)
+def create_task_stream_token(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user),
+):
+    """Short-lived token that opens ``/tasks/stream?token=...`` for EventSource."""
+    _, session_id, _ = decode_access_token(credentials.credentials)
+    return {
+        "token": create_stream_token(current_user.username, session_id),
+        "expires_in": settings.STREAM_TOKEN_EXPIRE_SECONDS,
+    }
+
+
+@router.get("/stream")
+async def stream_task_changes(
+    request: Request,
+    last_event_id: Optional[int] = None,
+    db: Session = Depends(get_stream_db),
+    current_user: User = Depends(get_stream_user),
+):
+    """Server-sent events for every change to the current user's tasks.
+
+    Event ids are the user's task version. Reconnecting with
+    ``Last-Event-ID`` (or ``last_event_id``) replays what was missed, or sends
+    a ``reset`` event when the gap is too old and the client must refetch.
+    Authenticates with the Authorization header or, for browsers' EventSource,
+    a ``token`` from ``POST /tasks/stream/token``; the token only needs to be
+    valid when connecting.
+    """
+    if last_event_id is None and request.headers.get("last-event-id", "").isdigit():
+        last_event_id = int(request.headers["last-event-id"])
+    # Subscribe before reading the version so nothing falls in between
+    queue = change_feed.subscribe(current_user.id)
+    version = await run_in_threadpool(get_task_version, db, current_user.id)
+    # End the read transaction so the stream doesn't pin a pooled connection
+    await run_in_threadpool(db.commit)
+    return StreamingResponse(
+        _change_stream(request, current_user.id, queue, last_event_id, version),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _change_stream(
+    request: Request,
+    user_id: int,
+    queue: asyncio.Queue,
+    last_event_id: Optional[int],
+    version: int,
+):
+    try:
+        yield "retry: 3000\n\n"
+        sent = version if last_event_id is None else last_event_id
+        if sent < version:
+            missed = change_feed.replay(user_id, sent)
+            if not missed:
+                missed = [{"id": version, "type": "reset"}]
+            for event in missed:
+                yield format_sse(event)
+                sent = event["id"]
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), timeout=settings.CHANGE_FEED_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event["id"] <= sent and event["type"] != "reset":
+                continue  # already delivered through the replay
+            sent = max(sent, event["id"])
+            yield format_sse(event)
+    finally:
+        change_feed.unsubscribe(user_id, queue)
 
 
 @router.post("/", response_model=TaskResponse)
 def create_new_task(
     task: TaskCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_shard_db),
     current_user: User = Depends(get_current_user),
 ):
     return create_task(db=db, task=task, user_id=current_user.id)
 
 
+@router.post("/bulk", response_model=TaskBulkResponse)
+def bulk_tasks(
+    request: TaskBulkRequest,
+    db: Session = Depends(get_shard_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Apply up to 1000 create/update/delete operations in one transaction."""
+    results = bulk_apply(db, operations=request.operations, user_id=current_user.id)
+    return {"results": results}
+
+
+@router.post("/import", response_model=TaskImportResult)
+def import_user_tasks(
+    file: UploadFile = File(...),
+    format: Optional[Literal["ndjson", "csv"]] = None,
+    db: Session = Depends(get_shard_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Create tasks from an uploaded NDJSON or CSV file.
+
+    ``format`` defaults to what the file name implies. The upload is parsed
+    line by line and written in batches that commit independently; invalid
+    rows are skipped and reported with their line numbers.
+    """
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        records = PARSERS[format or import_format(file.filename)](lines)
+        return import_tasks(db, user_id=current_user.id, records=records)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Upload must be UTF-8 encoded")
+    finally:
+        lines.detach()
+
+
+@router.get("/{task_id}", response_model=TaskResponse)
+def read_task(
+    task_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    # The ETag covers all of the user's tasks, so only a task that exists
+    # can be "not modified"; If-None-Match: * must not hide a 404
+    db_task = get_task_by_id(db, task_id=task_id, user_id=current_user.id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    etag = make_etag(current_user.id, get_task_version(db, current_user.id), request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+    return db_task
+
+
 @router.put("/{task_id}", response_model=TaskResponse)
 def update_existing_task(
     task_id: int,
     task_update: TaskUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_shard_db),
     current_user: User = Depends(get_current_user),
 ):
     db_task = update_task(
@@ -50,7 +346,7 @@ def update_existing_task(
 @router.delete("/{task_id}")
 def delete_existing_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_shard_db),
     current_user: User = Depends(get_current_user),
 ):
     db_task = delete_task(db, task_id=task_id, user_id=current_user.id)
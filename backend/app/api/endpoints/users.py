@@ -1,39 +1,86 @@
-from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPBearer
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.api.dependencies import get_current_user
+from app.api.dependencies import get_current_user, security
 from app.core.database import get_db
-from app.core.security import create_access_token
-from app.schemas.user import Token, UserCreate, UserResponse
-from app.services.user_service import authenticate_user, create_user
-from app.core.config import settings
+from app.core.security import decode_access_token
+from app.schemas.user import RefreshRequest, Token, UserCreate, UserResponse
+from app.services.user_service import (
+    authenticate_user,
+    create_user,
+    get_user_by_username_or_email,
+)
+from app.services.token_service import (
+    InvalidRefreshToken,
+    issue_tokens,
+    refresh_tokens,
+    revoke_session,
+)
 
 
 router = APIRouter()
 
 
+def registration_conflict_detail(existing, user: UserCreate) -> str:
+    if existing.username == user.username:
+        return "Username already registered"
+    return "Email already registered"
+
+
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = authenticate_user(db, username=user.username, password=user.password)
-    if db_user:
-        raise HTTPException(status_code=400, detail="Username already registered")
-    return create_user(db=db, user=user)
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    # Async so that waiting for bcrypt holds no threadpool thread
+    existing = await run_in_threadpool(
+        get_user_by_username_or_email, db, username=user.username, email=user.email
+    )
+    if existing:
+        raise HTTPException(
+            status_code=400, detail=registration_conflict_detail(existing, user)
+        )
+    try:
+        return await create_user(db=db, user=user)
+    except IntegrityError:
+        # Lost a race with a concurrent registration for the same identity
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(
+            status_code=400, detail="Username or email already registered"
+        )
 
 
 @router.post("/login", response_model=Token)
-def login(username: str, password: str, db: Session = Depends(get_db)):
-    user = authenticate_user(db, username, password)
+async def login(username: str, password: str, db: Session = Depends(get_db)):
+    user = await authenticate_user(db, username, password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return await run_in_threadpool(issue_tokens, db, user)
+
+
+@router.post("/refresh", response_model=Token)
+def refresh(body: RefreshRequest, db: Session = Depends(get_db)):
+    """Rotate a refresh token into a new token pair, without a password check."""
+    try:
+        return refresh_tokens(db, body.refresh_token)
+    except InvalidRefreshToken as exc:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc))
+
+
+@router.post("/logout")
+def logout(
+    credentials: HTTPBearer = Depends(security),
+    current_user: UserResponse = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Revoke the session of the presented token on every worker."""
+    _, session_id, _ = decode_access_token(credentials.credentials)
+    if session_id is not None:
+        revoke_session(db, session_id)
+    return {"message": "Logged out successfully"}
 
 
 @router.get("/me", response_model=UserResponse)
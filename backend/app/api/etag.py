@@ -0,0 +1,29 @@
+import hashlib
+
+from fastapi import Request, Response
+
+
+def make_etag(user_id: int, version: int, request: Request) -> str:
+    """Weak ETag for a user's task data at ``version`` as seen by ``request``.
+
+    The query string is folded in because it selects which tasks are returned.
+    """
+    key = f"{user_id}:{version}:{request.url.path}?{request.url.query}"
+    return f'W/"{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {candidate.strip() for candidate in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
+
+
+def cache_headers(etag: str) -> dict:
+    # Let clients keep the body but make them revalidate on every poll
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
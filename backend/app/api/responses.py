@@ -0,0 +1,14 @@
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson-encoded JSON, the API's default response class.
+
+    UTC datetimes are written with a ``Z`` suffix, matching what pydantic
+    produces for responses that go through a ``response_model``, so a payload
+    looks the same whichever path built it.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
@@ -1,8 +1,40 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import tasks, users
+from app.api.endpoints import async_tasks, async_users, tasks, users
+from app.core.config import settings
+
+
+def _routes_not_in(router: APIRouter, override: APIRouter) -> APIRouter:
+    """Copy of ``router`` without the routes ``override`` already serves."""
+    served = {
+        (route.path, method) for route in override.routes for method in route.methods
+    }
+    remaining = APIRouter()
+    remaining.routes.extend(
+        route
+        for route in router.routes
+        if not any((route.path, method) in served for method in route.methods)
+    )
+    return remaining
 
 
 api_router = APIRouter()
-api_router.include_router(users.router, prefix="/users", tags=["users"])
-api_router.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
+
+if settings.ASYNC_DATABASE:
+    # Async handlers take over the routes they implement; anything without an
+    # async counterpart keeps being served by the sync router.
+    api_router.include_router(async_users.router, prefix="/users", tags=["users"])
+    api_router.include_router(async_tasks.router, prefix="/tasks", tags=["tasks"])
+    api_router.include_router(
+        _routes_not_in(users.router, async_users.router),
+        prefix="/users",
+        tags=["users"],
+    )
+    api_router.include_router(
+        _routes_not_in(tasks.router, async_tasks.router),
+        prefix="/tasks",
+        tags=["tasks"],
+    )
+else:
+    api_router.include_router(users.router, prefix="/users", tags=["users"])
+    api_router.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
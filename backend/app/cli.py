@@ -0,0 +1,233 @@
+"""Maintenance commands, run as ``python -m app.cli <command>``."""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, engine
+from app.core.sharding import shards
+from app.models import task, task_summary, user  # noqa: F401 - register mappers
+from app.services.shard_service import (
+    MoveConflict,
+    move_user,
+    plan_rebalance,
+    resolve_shard,
+    shard_loads,
+    shard_session,
+)
+from app.services.schema_service import upgrade_schema
+from app.services.token_service import purge_expired_tokens
+from app.services.user_service import get_user_by_username
+from app.services.task_io import PARSERS, import_format
+from app.services.task_service import (
+    check_task_stats,
+    import_tasks,
+    purge_tombstones,
+    rebuild_task_stats,
+)
+
+
+def upgrade_db(args) -> None:
+    Base.metadata.create_all(bind=engine)
+    shards.create_schema()
+    for name in shards.names:
+        for change in upgrade_schema(shards.engines[name]):
+            print(f"{name}: {change}")
+    print("Schema is up to date")
+
+
+def reap_tombstones(args) -> None:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+    removed = 0
+    for name in shards.names:
+        with shards.session(name) as db:
+            removed += purge_tombstones(db, older_than=cutoff)
+    print(f"Removed {removed} tombstones deleted before {cutoff.isoformat()}")
+
+
+def reap_tokens(args) -> None:
+    with SessionLocal() as db:
+        removed = purge_expired_tokens(db)
+    print(f"Removed {removed} expired refresh tokens")
+
+
+def check_stats(args) -> int:
+    mismatches = []
+    for name in shards.names:
+        with shards.session(name) as db:
+            mismatches += check_task_stats(db)
+    for owner_id, stored, actual in mismatches:
+        print(f"user {owner_id}: stored total/completed {stored}, actual {actual}")
+    print(f"{len(mismatches)} users with inconsistent task counters")
+    return 1 if mismatches else 0
+
+
+def rebuild_stats(args) -> None:
+    fixed = 0
+    for name in shards.names:
+        with shards.session(name) as db:
+            fixed += rebuild_task_stats(db)
+    print(f"Rebuilt task counters for {fixed} users")
+
+
+def import_user_tasks(args) -> int:
+    started = time.perf_counter()
+
+    def report(result):
+        rate = result.imported / (time.perf_counter() - started)
+        print(
+            f"{result.imported} imported, {result.failed} failed ({rate:,.0f} rows/s)",
+            file=sys.stderr,
+        )
+
+    with SessionLocal() as db:
+        owner = get_user_by_username(db, args.username)
+        if owner is None:
+            print(f"No such user: {args.username}", file=sys.stderr)
+            return 2
+        name = resolve_shard(db, owner.id)[0] if shards.enabled else "default"
+        tasks_db = shard_session(db, name)
+        with open(args.file, encoding="utf-8-sig", newline="") as lines:
+            records = PARSERS[args.format or import_format(args.file)](lines)
+            result = import_tasks(
+                tasks_db,
+                user_id=owner.id,
+                records=records,
+                batch_size=args.batch_size,
+                on_progress=report,
+            )
+        if tasks_db is not db:
+            tasks_db.close()
+    for error in result.errors:
+        print(f"line {error.line}: {error.error}")
+    print(f"Imported {result.imported} tasks, {result.failed} rows failed")
+    return 1 if result.failed else 0
+
+
+def list_shards(args) -> None:
+    with SessionLocal() as db:
+        loads = shard_loads(db)
+    for name, users in loads.items():
+        tasks = sum(total for _, total in users)
+        print(f"{name}: {len(users)} users, {tasks} tasks")
+
+
+def move_user_tasks(args) -> int:
+    with SessionLocal() as db:
+        owner = get_user_by_username(db, args.username)
+        if owner is None:
+            print(f"No such user: {args.username}", file=sys.stderr)
+            return 2
+        try:
+            moved = move_user(
+                db, owner.id, args.shard, settle_seconds=args.settle_seconds
+            )
+        except MoveConflict as exc:
+            print(f"{exc}; nothing was moved, try again later", file=sys.stderr)
+            return 1
+    print(f"Moved {moved} tasks of {args.username} to {args.shard}")
+    return 0
+
+
+def rebalance_shards(args) -> int:
+    failed = 0
+    with SessionLocal() as db:
+        moves = plan_rebalance(db)
+        for user_id, source, target, tasks in moves:
+            print(f"user {user_id}: {source} -> {target} ({tasks} tasks)")
+            if args.dry_run:
+                continue
+            try:
+                move_user(db, user_id, target, settle_seconds=args.settle_seconds)
+            except MoveConflict as exc:
+                print(f"{exc}; skipped", file=sys.stderr)
+                failed += 1
+    verb = "Planned" if args.dry_run else "Made"
+    print(f"{verb} {len(moves) - failed} moves")
+    return 1 if failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    upgrade = commands.add_parser(
+        "upgrade-db", help="Create missing tables and upgrade existing ones"
+    )
+    upgrade.set_defaults(handler=upgrade_db)
+
+    reap = commands.add_parser(
+        "reap-tombstones", help="Hard-delete tasks soft-deleted long ago"
+    )
+    reap.add_argument(
+        "--older-than-days",
+        type=int,
+        default=settings.TOMBSTONE_RETENTION_DAYS,
+        help="Retention period (default: %(default)s)",
+    )
+    reap.set_defaults(handler=reap_tombstones)
+
+    tokens = commands.add_parser(
+        "reap-tokens", help="Delete expired refresh tokens and revocations"
+    )
+    tokens.set_defaults(handler=reap_tokens)
+
+    check = commands.add_parser(
+        "check-stats", help="Compare task counters with the tasks table"
+    )
+    check.set_defaults(handler=check_stats)
+
+    rebuild = commands.add_parser(
+        "rebuild-stats", help="Recount task counters that drifted"
+    )
+    rebuild.set_defaults(handler=rebuild_stats)
+
+    load = commands.add_parser(
+        "import-tasks", help="Create tasks for a user from an NDJSON or CSV file"
+    )
+    load.add_argument("username")
+    load.add_argument("file")
+    load.add_argument(
+        "--format",
+        choices=sorted(PARSERS),
+        help="Default: implied by the file extension, else ndjson",
+    )
+    load.add_argument("--batch-size", type=int, default=5000)
+    load.set_defaults(handler=import_user_tasks)
+
+    listing = commands.add_parser("shards", help="Show users and tasks per shard")
+    listing.set_defaults(handler=list_shards)
+
+    settle = argparse.ArgumentParser(add_help=False)
+    settle.add_argument(
+        "--settle-seconds",
+        type=float,
+        default=settings.SHARD_MAP_CACHE_SECONDS,
+        help="Wait for workers to stop writing first (default: %(default)s)",
+    )
+    move = commands.add_parser(
+        "move-user", parents=[settle], help="Move a user's tasks to another shard"
+    )
+    move.add_argument("username")
+    move.add_argument("shard", choices=shards.names)
+    move.set_defaults(handler=move_user_tasks)
+
+    rebalance = commands.add_parser(
+        "rebalance", parents=[settle], help="Move users to even out shard sizes"
+    )
+    rebalance.add_argument(
+        "--dry-run", action="store_true", help="Only print the planned moves"
+    )
+    rebalance.set_defaults(handler=rebalance_shards)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
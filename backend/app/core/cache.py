@@ -0,0 +1,83 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCache:
+    """Same interface as :class:`TTLCache`, shared across workers via Redis.
+
+    ``client`` is anything exposing redis-py's ``get``/``set``/``delete``/
+    ``scan_iter``; values must be JSON serializable.
+    """
+
+    def __init__(self, client, ttl: float = 60.0, prefix: str = "cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        seconds = max(int(self.ttl if ttl is None else ttl), 1)
+        self.client.set(self.prefix + key, json.dumps(value), ex=seconds)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+def build_cache(maxsize: int, ttl: float, redis_url: Optional[str], prefix: str):
+    """Redis-backed cache when ``redis_url`` is set, otherwise in-process."""
+    if redis_url:
+        import redis  # optional dependency, only needed for shared caches
+
+        return RedisCache(redis.Redis.from_url(redis_url), ttl=ttl, prefix=prefix)
+    return TTLCache(maxsize=maxsize, ttl=ttl)
@@ -0,0 +1,169 @@
+"""Adaptive concurrency limiting: shed load before latency collapses.
+
+Past the point where the database or bcrypt pool saturates, admitting more
+requests only makes every one of them slower. :class:`ConcurrencyLimiter`
+lets at most ``limit`` requests run at once and queues a bounded number more;
+anything beyond that, or anything that waited longer than the queue timeout,
+gets 503 straight away. The limit itself follows latency AIMD-style: it grows
+by about one per round of requests completing within the target and shrinks
+by ``backoff`` when they run over it.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Optional
+
+from app.core.config import settings
+from app.core.instrumentation import registry
+from app.core.metrics import CallbackGauge
+from app.core.ratelimit import reject, requests_shed_total
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str):
+        super().__init__(f"Server overloaded ({reason}), retry shortly")
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """Per-worker admission control for an asyncio event loop."""
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int,
+        target_latency: float,
+        queue_size: int,
+        queue_timeout: float,
+        backoff: float = 0.9,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.target_latency = target_latency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Shrink at most once per latency window so one slow burst does not
+        # collapse the limit
+        self._last_decrease = 0.0
+
+    async def acquire(self) -> None:
+        """Wait for a slot; raises Overloaded if none frees up in time."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise Overloaded("queue full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+            if isinstance(exc, asyncio.TimeoutError):
+                raise Overloaded("queue timeout")
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, latency: Optional[float] = None) -> None:
+        """Free a slot, adapting the limit to the latency it was held for."""
+        if latency is not None:
+            self._adapt(latency)
+        while self._waiters and self.in_flight <= int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes straight to the waiter
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _adapt(self, latency: float) -> None:
+        if latency <= self.target_latency:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            return
+        now = time.monotonic()
+        if now - self._last_decrease >= self.target_latency:
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def reset(self) -> None:
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._waiters.clear()
+        self._last_decrease = 0.0
+
+
+concurrency_limiter = ConcurrencyLimiter(
+    max_limit=settings.CONCURRENCY_LIMIT_MAX,
+    min_limit=settings.CONCURRENCY_LIMIT_MIN,
+    target_latency=settings.CONCURRENCY_TARGET_LATENCY_SECONDS,
+    queue_size=settings.CONCURRENCY_QUEUE_SIZE,
+    queue_timeout=settings.CONCURRENCY_QUEUE_TIMEOUT_SECONDS,
+)
+
+registry.register(
+    "http_concurrency_limit",
+    "Adaptive concurrency limit, requests running and queued.",
+    CallbackGauge(
+        lambda: {
+            ("limit",): int(concurrency_limiter.limit),
+            ("in_flight",): concurrency_limiter.in_flight,
+            ("queued",): concurrency_limiter.queued,
+        }
+    ),
+    labels=("state",),
+)
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware answering 503 when the worker is over its limit.
+
+    Latency is measured to the start of the response, so long-lived streams
+    such as exports and the change feed do not read as slow requests; paths
+    in ``CONCURRENCY_EXEMPT_PATHS`` skip admission entirely.
+    """
+
+    def __init__(self, app, limiter: ConcurrencyLimiter = concurrency_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or self.limiter.max_limit <= 0
+            or scope["path"] in settings.CONCURRENCY_EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.limiter.acquire()
+        except Overloaded as exc:
+            requests_shed_total.inc(exc.reason)
+            await reject(send, 503, str(exc), self.limiter.queue_timeout)
+            return
+        started = time.perf_counter()
+        latency = None
+
+        async def send_with_latency(message):
+            nonlocal latency
+            if message["type"] == "http.response.start":
+                latency = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_latency)
+        finally:
+            self.limiter.release(latency)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Literal, Optional
 from pydantic_settings import BaseSettings
 import os
 from dotenv import load_dotenv
@@ -13,11 +13,107 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = "sqlite:///./vigilant_todo.db"
+    # Connection pool (ignored for in-memory SQLite, which shares one connection)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Read replicas for task list/detail/stats/export reads, used round-robin.
+    # A replica failing a connection or health check is skipped for
+    # REPLICA_RETRY_SECONDS; users who wrote within READ_YOUR_WRITES_SECONDS
+    # read from the primary
+    READ_REPLICA_URLS: List[str] = []
+    REPLICA_HEALTH_CHECK_SECONDS: float = 10.0
+    REPLICA_RETRY_SECONDS: float = 30.0
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    # Task shards besides the primary (which is shard "default"), by name. New
+    # users are spread over SHARDS_FOR_NEW_USERS (default: every shard); the
+    # user -> shard directory is cached for SHARD_MAP_CACHE_SECONDS
+    SHARD_URLS: Dict[str, str] = {}
+    SHARDS_FOR_NEW_USERS: Optional[List[str]] = None
+    SHARD_MAP_CACHE_SECONDS: float = 5.0
+    # Serve the core task/user endpoints from an AsyncSession (aiosqlite/asyncpg)
+    ASYNC_DATABASE: bool = False
+    # Defaults to DATABASE_URL with the matching async driver swapped in
+    ASYNC_DATABASE_URL: Optional[str] = None
 
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # "jose" (python-jose) or "pyjwt" (PyJWT, faster; optional dependency)
+    JWT_BACKEND: Literal["jose", "pyjwt"] = "jose"
+    # Verified tokens remembered until they expire; 0 disables the cache
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    # Refresh tokens rotate on every use; logouts reach other workers within
+    # REVOCATION_SYNC_SECONDS
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REVOCATION_SYNC_SECONDS: float = 5.0
+    # Lifetime of the tokens EventSource clients pass in the /tasks/stream URL
+    STREAM_TOKEN_EXPIRE_SECONDS: int = 60
+    # bcrypt cost factor; existing hashes are upgraded on the next login
+    BCRYPT_ROUNDS: int = 12
+    # Dedicated bcrypt workers and how many calls may wait for them before
+    # further requests are shed with 503
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+
+    # Authenticated-user cache keyed by token subject; set a Redis URL to share
+    # it between workers
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_REDIS_URL: Optional[str] = None
+
+    # Task change feed (SSE); set a Redis URL to fan events out across workers
+    CHANGE_FEED_HISTORY: int = 200
+    CHANGE_FEED_HEARTBEAT_SECONDS: float = 15.0
+    CHANGE_FEED_REDIS_URL: Optional[str] = None
+
+    # Deleted tasks are kept as tombstones for delta sync this long
+    TOMBSTONE_RETENTION_DAYS: int = 30
+
+    # Query diagnostics: queries slower than SLOW_QUERY_SECONDS are always
+    # logged; with QUERY_DETECTOR on, requests issuing more than QUERY_BUDGET
+    # queries or one statement shape QUERY_REPEAT_LIMIT+ times (N+1) are too
+    SLOW_QUERY_SECONDS: float = 0.5
+    QUERY_DETECTOR: bool = False
+    QUERY_BUDGET: int = 20
+    QUERY_REPEAT_LIMIT: int = 5
+
+    # Token-bucket rate limits per client (token subject, else IP address),
+    # as "<requests>/<second|minute|hour>". RATE_LIMITS maps "METHOD /path"
+    # (path templates allowed, "*" for any method) to its own budget; every
+    # other route shares RATE_LIMIT_DEFAULT. Set a Redis URL to share the
+    # buckets between workers.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_DEFAULT: Optional[str] = "600/minute"
+    RATE_LIMITS: Dict[str, str] = {
+        "POST /api/v1/users/login": "10/minute",
+        "POST /api/v1/users/register": "5/minute",
+        "POST /api/v1/users/refresh": "30/minute",
+        "POST /api/v1/tasks/import": "10/hour",
+    }
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+
+    # Adaptive concurrency limit per worker: the limit floats between MIN and
+    # MAX (0 disables shedding) to keep time-to-response under the target;
+    # up to QUEUE_SIZE requests wait QUEUE_TIMEOUT for a slot, the rest get 503
+    CONCURRENCY_LIMIT_MAX: int = 64
+    CONCURRENCY_LIMIT_MIN: int = 4
+    CONCURRENCY_TARGET_LATENCY_SECONDS: float = 0.5
+    CONCURRENCY_QUEUE_SIZE: int = 128
+    CONCURRENCY_QUEUE_TIMEOUT_SECONDS: float = 1.0
+    # Operational endpoints (/internal/*, /metrics) answer only requests
+    # carrying "Authorization: Bearer <INTERNAL_TOKEN>"; unset, they answer 404
+    INTERNAL_TOKEN: Optional[str] = None
+
+    # Long-lived or operational endpoints that bypass admission control
+    CONCURRENCY_EXEMPT_PATHS: List[str] = [
+        "/health",
+        "/metrics",
+        "/api/v1/tasks/stream",
+    ]
 
     # CORS - Updated for frontend
     CORS_ORIGINS: List[str] = [
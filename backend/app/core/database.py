@@ -1,13 +1,74 @@
+import time
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 from app.core.config import settings
+from app.core.metrics import Histogram
+
+
+# Time spent waiting for a connection to be checked out of the primary pool
+pool_wait_seconds = Histogram()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - start)
 
-if settings.DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        settings.DATABASE_URL, connect_args={"check_same_thread": False}
+
+def _is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return database in (None, "", ":memory:")
+
+
+def get_engine_options(url: str, queue_pool=QueuePool) -> dict:
+    """Pool and connect arguments for ``url`` built from ``settings``."""
+    options = {}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+        if _is_memory_sqlite(url):
+            # Every connection to :memory: is a separate database, so all
+            # threads must share the one connection.
+            options["poolclass"] = StaticPool
+            return options
+    options.update(
+        poolclass=queue_pool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
     )
-else:
-    engine = create_engine(settings.DATABASE_URL)
+    return options
+
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    **get_engine_options(settings.DATABASE_URL, queue_pool=InstrumentedQueuePool),
+)
+
+
+def get_pool_stats(engine=engine) -> dict:
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+        )
+    stats["wait_seconds"] = pool_wait_seconds.snapshot()
+    return stats
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -15,6 +76,35 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def get_async_database_url(url: str) -> str:
+    """Swap the sync driver in ``url`` for its asyncio counterpart."""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.ASYNC_DATABASE:
+    _async_url = settings.ASYNC_DATABASE_URL or get_async_database_url(
+        settings.DATABASE_URL
+    )
+    async_engine = create_async_engine(
+        _async_url,
+        **get_engine_options(_async_url, queue_pool=AsyncAdaptedQueuePool),
+    )
+    # expire_on_commit=False: attributes can't be lazily reloaded outside the
+    # event loop, so keep them populated after commit.
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -22,3 +112,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
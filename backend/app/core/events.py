@@ -0,0 +1,154 @@
+import asyncio
+import json
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+
+
+class LocalBackend:
+    """Fan-out within this process only.
+
+    A cross-worker backend implements the same two methods: ``publish`` sends
+    a message to every worker, and ``start`` registers the callback through
+    which messages (including this worker's own) are delivered locally.
+    """
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[dict], None]] = None
+
+    def start(self, deliver: Callable[[dict], None]) -> None:
+        self._deliver = deliver
+
+    def publish(self, message: dict) -> None:
+        self._deliver(message)
+
+
+class RedisBackend:
+    """Fan-out between workers over a Redis pub/sub channel."""
+
+    def __init__(self, client, channel: str = "task-changes"):
+        self.client = client
+        self.channel = channel
+        self._thread = None
+
+    def start(self, deliver: Callable[[dict], None]) -> None:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(
+            **{self.channel: lambda message: deliver(json.loads(message["data"]))}
+        )
+        self._thread = pubsub.run_in_thread(sleep_time=0.01, daemon=True)
+
+    def publish(self, message: dict) -> None:
+        self.client.publish(self.channel, json.dumps(message))
+
+
+class ChangeBroker:
+    """Per-user pub/sub of task change events with a short replay buffer.
+
+    Events are dicts carrying an integer ``id`` (the user's task version after
+    the change), a ``type`` and a payload. ``publish`` is thread-safe; events
+    are handed to subscriber queues on the subscriber's own event loop.
+    """
+
+    def __init__(self, backend=None, history: int = 200, max_users: int = 10000):
+        self.history = history
+        self.max_users = max_users
+        # user id -> [highest id possibly missing from the buffer, events]
+        self._recent: "OrderedDict[int, list]" = OrderedDict()
+        self._subscribers: Dict[int, Set[tuple]] = {}
+        self._lock = threading.Lock()
+        self.backend = backend or LocalBackend()
+        self.backend.start(self._deliver)
+
+    def publish(self, user_id: int, event: dict) -> None:
+        self.backend.publish({"user_id": user_id, "event": event})
+
+    def subscribe(self, user_id: int, maxsize: int = 1000) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(
+                (asyncio.get_running_loop(), queue)
+            )
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update(
+                {entry for entry in subscribers if entry[1] is queue}
+            )
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def replay(self, user_id: int, last_event_id: int) -> Optional[List[dict]]:
+        """Buffered events after ``last_event_id``, or None if some were lost.
+
+        Ids may skip values, so loss is detected against the newest id known
+        to be missing from the buffer rather than by looking for gaps.
+        """
+        with self._lock:
+            buffered = self._recent.get(user_id)
+            if buffered is None:
+                return []
+            floor, recent = buffered[0], list(buffered[1])
+        if last_event_id < floor:
+            return None
+        return [event for event in recent if event["id"] > last_event_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recent.clear()
+
+    def _deliver(self, message: dict) -> None:
+        user_id, event = message["user_id"], message["event"]
+        with self._lock:
+            buffered = self._recent.get(user_id)
+            if buffered is None:
+                # Anything before the first event seen here may be missing
+                buffered = self._recent[user_id] = [
+                    event["id"] - 1,
+                    deque(maxlen=self.history),
+                ]
+                while len(self._recent) > self.max_users:
+                    self._recent.popitem(last=False)
+            else:
+                self._recent.move_to_end(user_id)
+            floor, recent = buffered
+            if len(recent) == recent.maxlen:
+                buffered[0] = max(floor, recent[0]["id"])
+            recent.append(event)
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(user_id, queue)
+
+
+def _offer(queue: asyncio.Queue, event: dict) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # Slow consumer: drop its backlog and tell it to resynchronize
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({"id": event["id"], "type": "reset"})
+
+
+def format_sse(event: dict) -> str:
+    data = json.dumps({key: value for key, value in event.items() if key != "id"})
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+def _build_backend():
+    if settings.CHANGE_FEED_REDIS_URL:
+        import redis  # optional dependency, only needed across workers
+
+        return RedisBackend(redis.Redis.from_url(settings.CHANGE_FEED_REDIS_URL))
+    return LocalBackend()
+
+
+change_feed = ChangeBroker(_build_backend(), history=settings.CHANGE_FEED_HISTORY)
@@ -0,0 +1,209 @@
+"""Per-request latency, status and database metrics.
+
+:class:`MetricsMiddleware` times every HTTP request and, through SQLAlchemy
+cursor events, counts the queries it ran and the time they took. Totals are
+published on ``/metrics`` in the Prometheus text format and each response
+carries a ``Server-Timing`` header with its own numbers.
+
+The same hooks log slow queries and, with ``QUERY_DETECTOR`` on, requests
+that blow their query budget or repeat one statement per row (N+1).
+"""
+import logging
+import re
+import time
+from collections import Counter as Tally
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.database import get_pool_stats, pool_wait_seconds
+from app.core.metrics import (
+    CallbackGauge,
+    Counter,
+    Gauge,
+    Histogram,
+    HistogramVec,
+    Registry,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Bound parameter lists, e.g. "IN (?, ?, ?)", collapse so they share a shape
+_PARAMETER_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)\s*,?)+\)")
+_TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+class QueryLog:
+    """Statements issued by one unit of work, grouped by shape."""
+
+    def __init__(self):
+        self.shapes: Tally = Tally()
+
+    def record(self, statement: str) -> None:
+        statement = " ".join(statement.split())
+        if not statement.upper().startswith(_TRANSACTION_CONTROL):
+            self.shapes[_PARAMETER_LIST.sub("(?)", statement)] += 1
+
+    @property
+    def count(self) -> int:
+        return sum(self.shapes.values())
+
+    def problems(self, budget: int, repeat_limit: int) -> List[str]:
+        """Human-readable descriptions of budget and N+1 violations."""
+        found = []
+        if self.count > budget:
+            found.append(f"{self.count} queries, over the budget of {budget}")
+        for shape, times in self.shapes.most_common():
+            if times < repeat_limit:
+                break
+            found.append(f"{times} x {shape[:200]}")
+        return found
+
+
+class RequestStats:
+    """Database work done on behalf of the current request."""
+
+    __slots__ = ("queries", "db_seconds", "log")
+
+    def __init__(self, log: Optional[QueryLog] = None):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.log = log
+
+
+# Set by the middleware; thread-pool endpoints and dependencies run in a copy
+# of the request's context, so they update the same object.
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def _pool_connections():
+    stats = get_pool_stats()
+    return {
+        (state,): stats[state]
+        for state in ("size", "checked_in", "checked_out", "overflow")
+        if state in stats
+    }
+
+
+registry = Registry()
+requests_total = registry.register(
+    "http_requests_total",
+    "HTTP requests by route and status.",
+    Counter(),
+    labels=("method", "route", "status"),
+)
+request_seconds = registry.register(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    HistogramVec(),
+    labels=("method", "route"),
+)
+requests_in_flight = registry.register(
+    "http_requests_in_flight", "HTTP requests being served.", Gauge()
+)
+request_queries_total = registry.register(
+    "http_request_db_queries_total",
+    "Database queries issued by requests, by route.",
+    Counter(),
+    labels=("method", "route"),
+)
+request_db_seconds_total = registry.register(
+    "http_request_db_seconds_total",
+    "Time spent in database queries by requests, by route.",
+    Counter(),
+    labels=("method", "route"),
+)
+query_seconds = registry.register(
+    "db_query_duration_seconds", "Latency of every database query.", Histogram()
+)
+registry.register(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check out a pooled connection.",
+    pool_wait_seconds,
+)
+registry.register(
+    "db_pool_connections",
+    "Connections in the primary pool by state.",
+    CallbackGauge(_pool_connections),
+    labels=("state",),
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_started")
+    query_seconds.observe(elapsed)
+    if elapsed >= settings.SLOW_QUERY_SECONDS:
+        logger.warning("Slow query (%.3fs): %s", elapsed, " ".join(statement.split()))
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.log is not None:
+            stats.log.record(statement)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and DB work per route.
+
+    Routes are labelled by their path template (``/api/v1/tasks/{task_id}``)
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(QueryLog() if settings.QUERY_DETECTOR else None)
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = (
+                    f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} '
+                    f'queries", app;dur={(time.perf_counter() - started) * 1000:.2f}'
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            requests_in_flight.dec()
+            _request_stats.reset(token)
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            labels = (scope["method"], route)
+            request_seconds.labels(*labels).observe(time.perf_counter() - started)
+            requests_total.inc(*labels, str(status))
+            request_queries_total.inc(*labels, amount=stats.queries)
+            request_db_seconds_total.inc(*labels, amount=stats.db_seconds)
+            if stats.log is not None:
+                for problem in stats.log.problems(
+                    settings.QUERY_BUDGET, settings.QUERY_REPEAT_LIMIT
+                ):
+                    logger.warning("%s %s: %s", *labels, problem)
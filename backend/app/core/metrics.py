@@ -0,0 +1,153 @@
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Seconds; tuned for DB pool waits and request latencies alike
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram of observations in seconds."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict:
+        """Cumulative bucket counts keyed by upper bound, plus sum and count."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {"buckets": cumulative, "sum": total, "count": running}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+
+
+class HistogramVec:
+    """One :class:`Histogram` per combination of label values."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._children: Dict[Tuple, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> Histogram:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def snapshot(self) -> Dict[Tuple, Dict]:
+        with self._lock:
+            children = list(self._children.items())
+        return {values: child.snapshot() for values, child in children}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._children.clear()
+
+
+class Counter:
+    """Thread-safe monotonic counters keyed by label values."""
+
+    def __init__(self):
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def snapshot(self) -> Dict[Tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge:
+    """A value that goes up and down, such as requests in flight."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def snapshot(self) -> Dict[Tuple, float]:
+        return {(): self._value}
+
+
+class CallbackGauge:
+    """Gauge values computed at scrape time by ``collect() -> {labels: value}``."""
+
+    def __init__(self, collect: Callable[[], Dict[Tuple, float]]):
+        self.collect = collect
+
+    def snapshot(self) -> Dict[Tuple, float]:
+        return self.collect()
+
+
+class Registry:
+    """Named metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: List[tuple] = []
+
+    def register(self, name: str, help: str, metric, labels: Sequence[str] = ()):
+        self._metrics.append((name, help, metric, tuple(labels)))
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for name, help, metric, label_names in self._metrics:
+            if isinstance(metric, (Histogram, HistogramVec)):
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+                snapshots = metric.snapshot()
+                if isinstance(metric, Histogram):
+                    snapshots = {(): snapshots}
+                for values, snapshot in sorted(snapshots.items()):
+                    labels = list(zip(label_names, values))
+                    for bound, count in snapshot["buckets"].items():
+                        le = _labels(labels + [("le", bound)])
+                        lines.append(f"{name}_bucket{le} {count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {snapshot['sum']}")
+                    lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+                continue
+            kind = "counter" if isinstance(metric, Counter) else "gauge"
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for values, value in sorted(metric.snapshot().items()):
+                lines.append(f"{name}{_labels(zip(label_names, values))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(pairs) -> str:
+    rendered = ",".join(f'{key}="{_escape(value)}"' for key, value in pairs)
+    return "{" + rendered + "}" if rendered else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
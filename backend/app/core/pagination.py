@@ -0,0 +1,34 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplies a cursor we did not issue."""
+
+
+def _dump(value):
+    return {"dt": value.isoformat()} if isinstance(value, datetime) else value
+
+
+def _load(value):
+    return datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+
+
+def encode_cursor(*values) -> str:
+    """Opaque token for the sort key of the last row on a page."""
+    payload = json.dumps([_dump(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int = 2) -> Tuple:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("unexpected cursor shape")
+        return tuple(_load(value) for value in values)
+    except (binascii.Error, ValueError, TypeError, KeyError) as exc:
+        raise InvalidCursor("Invalid pagination cursor") from exc
@@ -0,0 +1,230 @@
+"""Token-bucket rate limiting per client and route.
+
+Budgets are written as ``"<requests>/<second|minute|hour>"``: a client may
+burst up to ``requests`` at once and then gets them back evenly over the
+period. Authenticated requests are keyed by token subject, anonymous ones by
+client address, and every budget in ``RATE_LIMITS`` has buckets of its own so
+a login storm cannot eat into the task budget of the same client.
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.routing import compile_path
+
+from app.core.config import settings
+from app.core.instrumentation import registry
+from app.core.metrics import Counter
+from app.core.security import decode_access_token
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0}
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def parse_budget(budget: str) -> Tuple[float, float]:
+    """``"10/minute"`` -> (refill rate in tokens per second, burst size)."""
+    count, _, period = budget.partition("/")
+    if period not in PERIODS or not count.strip().isdigit():
+        raise ValueError(f"Invalid rate limit {budget!r}, expected e.g. '10/minute'")
+    burst = float(count)
+    return burst / PERIODS[period], burst
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process, least recently used evicted first.
+
+    An evicted bucket simply starts full again, so the bound only ever makes
+    the limiter more lenient.
+    """
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        # key -> (tokens left, monotonic time they were counted)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        """Spend ``cost`` tokens; returns 0 on success, else seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+# KEYS[1] bucket; ARGV rate, burst, cost. Uses the server clock so workers
+# with skewed clocks agree. Returns the wait in milliseconds, 0 if allowed.
+_TAKE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = math.ceil((cost - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return wait
+"""
+
+
+class RedisBucketStore:
+    """Same interface as :class:`MemoryBucketStore`, shared across workers.
+
+    Each take is one atomic server-side script, so concurrent workers never
+    both spend the last token. Takes go through redis-py's asyncio client, so
+    a slow Redis delays the requests being checked, not the whole event loop.
+    """
+
+    def __init__(self, redis_url: str, prefix: str = "ratelimit:"):
+        import redis.asyncio  # optional dependency, only needed for shared limits
+
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self.client = redis.asyncio.Redis.from_url(redis_url)
+        self._take = self.client.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        wait_ms = await self._take(keys=[self.prefix + key], args=[rate, burst, cost])
+        return int(wait_ms) / 1000
+
+    def clear(self) -> None:
+        # Maintenance only, so a short-lived blocking client will do
+        import redis
+
+        with redis.Redis.from_url(self.redis_url) as client:
+            for key in client.scan_iter(match=self.prefix + "*"):
+                client.delete(key)
+
+
+def build_bucket_store(redis_url: Optional[str], maxsize: int = 100000):
+    """Redis-backed buckets when ``redis_url`` is set, otherwise in-process."""
+    if redis_url:
+        return RedisBucketStore(redis_url)
+    return MemoryBucketStore(maxsize=maxsize)
+
+
+class RateLimiter:
+    """Maps requests to budgets and charges the matching bucket."""
+
+    def __init__(self, store, limits: Dict[str, str], default: Optional[str]):
+        self.store = store
+        # (method, path regex, bucket name, rate, burst), first match wins
+        self.rules: List[tuple] = []
+        for rule, budget in limits.items():
+            method, _, path = rule.partition(" ")
+            regex, _, _ = compile_path(path)
+            self.rules.append((method.upper(), regex, rule, *parse_budget(budget)))
+        self.default = ("default", *parse_budget(default)) if default else None
+
+    def budget_for(self, method: str, path: str) -> Optional[tuple]:
+        """(bucket name, rate, burst) for a request, or None if unlimited."""
+        for rule_method, regex, name, rate, burst in self.rules:
+            if rule_method in (method, "*") and regex.match(path):
+                return name, rate, burst
+        return self.default
+
+    async def check(self, method: str, path: str, client: str) -> None:
+        """Charge one request to ``client``; raises RateLimitExceeded."""
+        budget = self.budget_for(method, path)
+        if budget is None:
+            return
+        name, rate, burst = budget
+        wait = await self.store.take(f"{name}|{client}", rate, burst)
+        if wait > 0:
+            raise RateLimitExceeded(wait)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+
+def client_key(scope) -> str:
+    """Token subject for authenticated requests, else the client address."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            claims = decode_access_token(token) if scheme.lower() == "bearer" else None
+            if claims is not None:
+                return f"user:{claims[0]}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+rate_limiter = RateLimiter(
+    build_bucket_store(settings.RATE_LIMIT_REDIS_URL),
+    limits=settings.RATE_LIMITS,
+    default=settings.RATE_LIMIT_DEFAULT,
+)
+
+
+requests_shed_total = registry.register(
+    "http_requests_shed_total",
+    "Requests rejected before reaching the app, by reason.",
+    Counter(),
+    labels=("reason",),
+)
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 once a client exhausts a route budget."""
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.limiter.check(scope["method"], scope["path"], client_key(scope))
+        except RateLimitExceeded as exc:
+            requests_shed_total.inc("rate limit")
+            await reject(send, 429, str(exc), exc.retry_after)
+            return
+        await self.app(scope, receive, send)
+
+
+async def reject(send, status: int, detail: str, retry_after: float) -> None:
+    """Answer without running the app, telling the client when to come back."""
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(math.ceil(retry_after), 1)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
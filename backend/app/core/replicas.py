@@ -0,0 +1,146 @@
+"""Routing of read-only queries to read replicas.
+
+Replicas from ``READ_REPLICA_URLS`` are used round-robin. One that fails a
+connection or a periodic ``SELECT 1`` is skipped for
+``REPLICA_RETRY_SECONDS``, and with none available reads fall back to the
+primary. Users who wrote within ``READ_YOUR_WRITES_SECONDS`` keep reading
+from the primary, so replication lag never hides their own changes.
+"""
+import itertools
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.cache import build_cache
+from app.core.config import settings
+from app.core.database import get_engine_options
+from app.core.instrumentation import registry
+from app.core.metrics import CallbackGauge
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """Read replica engines with round-robin selection and health tracking."""
+
+    def __init__(self, urls: List[str], retry_seconds: float = 30.0):
+        self.engines: List[Engine] = [
+            create_engine(url, **get_engine_options(url)) for url in urls
+        ]
+        self.retry_seconds = retry_seconds
+        # Monotonic time until which each replica is considered down
+        self._down_until = [0.0] * len(self.engines)
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._sessionmaker = sessionmaker(autocommit=False, autoflush=False)
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def healthy(self) -> List[Engine]:
+        now = time.monotonic()
+        return [
+            engine
+            for engine, until in zip(self.engines, self._down_until)
+            if until <= now
+        ]
+
+    def choose(self) -> Optional[Engine]:
+        """Next healthy replica in turn, or None if all are down."""
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            with self._lock:
+                index = next(self._turn) % len(self.engines)
+            if self._down_until[index] <= now:
+                return self.engines[index]
+        return None
+
+    def mark_down(self, engine: Engine) -> None:
+        index = self.engines.index(engine)
+        if self._down_until[index] <= time.monotonic():
+            logger.warning("Read replica %s is down", engine.url)
+        self._down_until[index] = time.monotonic() + self.retry_seconds
+
+    def mark_up(self, engine: Engine) -> None:
+        index = self.engines.index(engine)
+        if self._down_until[index] > time.monotonic():
+            logger.info("Read replica %s is back", engine.url)
+        self._down_until[index] = 0.0
+
+    def check(self) -> int:
+        """Probe every replica, updating its health; returns how many are up."""
+        for engine in self.engines:
+            try:
+                with engine.connect() as connection:
+                    connection.exec_driver_sql("SELECT 1")
+            except DBAPIError:
+                self.mark_down(engine)
+            else:
+                self.mark_up(engine)
+        return len(self.healthy())
+
+    def session(self) -> Optional[Session]:
+        """Session on a healthy replica, or None to use the primary."""
+        for _ in range(len(self.engines)):
+            engine = self.choose()
+            if engine is None:
+                return None
+            db = self._sessionmaker(bind=engine)
+            try:
+                # Connect now, so a dead replica costs a retry, not the request
+                db.connection()
+            except DBAPIError:
+                db.close()
+                self.mark_down(engine)
+                continue
+            return db
+        return None
+
+    def dispose(self) -> None:
+        for engine in self.engines:
+            engine.dispose()
+
+
+read_replicas = ReplicaSet(
+    settings.READ_REPLICA_URLS, retry_seconds=settings.REPLICA_RETRY_SECONDS
+)
+
+
+def _replica_health():
+    healthy = len(read_replicas.healthy())
+    return {("healthy",): healthy, ("down",): len(read_replicas) - healthy}
+
+
+registry.register(
+    "db_read_replicas",
+    "Read replicas by health.",
+    CallbackGauge(_replica_health),
+    labels=("state",),
+)
+
+# User ids that wrote recently; shared through Redis along with the user cache
+recent_writers = build_cache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.READ_YOUR_WRITES_SECONDS,
+    redis_url=settings.USER_CACHE_REDIS_URL,
+    prefix="wrote:",
+)
+
+
+def note_write(user_id: int) -> None:
+    """Pin the user's reads to the primary until replicas have caught up."""
+    if read_replicas:
+        recent_writers.set(str(user_id), 1)
+
+
+def read_session(user_id: int) -> Optional[Session]:
+    """Replica session for the user's reads, or None to use the primary."""
+    if not read_replicas or recent_writers.get(str(user_id)) is not None:
+        return None
+    return read_replicas.session()
@@ -0,0 +1,55 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+
+class RevocationList:
+    """Revoked session ids, checked with one set lookup per request.
+
+    Each worker applies the revocations it performs immediately and picks up
+    everyone else's from the database every ``sync_interval`` seconds (see
+    :func:`app.services.token_service.sync_revocations`), so requests never
+    query for them. Entries drop out once the session's access tokens have
+    expired anyway, so the set stays as small as the number of recent logouts.
+    """
+
+    def __init__(self, sync_interval: float = 5.0):
+        self.sync_interval = sync_interval
+        # session id -> unix time after which its access tokens are all expired
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # Newest revoked_at already loaded from the database
+        self.watermark: Optional[datetime] = None
+
+    def __contains__(self, session_id: Optional[str]) -> bool:
+        return session_id in self._expires
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def add(self, session_id: str, expires_at: float) -> None:
+        with self._lock:
+            self._expires[session_id] = expires_at
+
+    def synced(self, watermark: Optional[datetime]) -> None:
+        """Record a completed sync and drop entries that no longer matter."""
+        now = time.time()
+        with self._lock:
+            if watermark is not None:
+                self.watermark = max(self.watermark or watermark, watermark)
+            self._expires = {
+                session_id: expires
+                for session_id, expires in self._expires.items()
+                if expires > now
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expires.clear()
+            self.watermark = None
+
+
+revoked_sessions = RevocationList(sync_interval=settings.REVOCATION_SYNC_SECONDS)
@@ -1,19 +1,111 @@
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, UTC
-from typing import Optional
+from typing import Optional, Tuple
 from passlib.context import CryptContext
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.revocation import revoked_sessions
 from jose import jwt, JWTError
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the bcrypt queue is full and the call should be shed."""
+
+
+# bcrypt releases the GIL, so a small thread pool gives real parallelism while
+# keeping hashing from occupying the request threadpool without bound.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+)
+_hash_slots = threading.BoundedSemaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+)
+
+
+def _submit_hash_job(fn, *args) -> Future:
+    if not _hash_slots.acquire(blocking=False):
+        raise PasswordHasherBusy("Too many password operations in progress")
+    try:
+        future = _hash_executor.submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _submit_hash_job(
+        pwd_context.verify, plain_password, hashed_password
+    ).result()
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _submit_hash_job(pwd_context.hash, password).result()
+
+
+async def averify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify, returning a replacement hash when the stored one is outdated."""
+    return await asyncio.wrap_future(
+        _submit_hash_job(pwd_context.verify_and_update, plain_password, hashed_password)
+    )
+
+
+async def aget_password_hash(password: str) -> str:
+    return await asyncio.wrap_future(_submit_hash_job(pwd_context.hash, password))
+
+
+class JoseBackend:
+    """JWT encoding and verification with python-jose."""
+
+    errors = (JWTError,)
+
+    def encode(self, claims: dict) -> str:
+        return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+    def decode(self, token: str) -> dict:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+class PyJWTBackend:
+    """Same interface as :class:`JoseBackend` on PyJWT, which decodes faster."""
+
+    def __init__(self):
+        import jwt as pyjwt  # optional dependency, only needed for this backend
+
+        self._jwt = pyjwt
+        self.errors = (pyjwt.PyJWTError,)
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(
+            claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        )
+
+    def decode(self, token: str) -> dict:
+        return self._jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+
+
+JWT_BACKENDS = {"jose": JoseBackend, "pyjwt": PyJWTBackend}
+
+jwt_backend = JWT_BACKENDS[settings.JWT_BACKEND]()
+
+# Token digest -> (subject, session id), for tokens that already passed
+# verification. Each entry expires with its token, so a hit is as good as a
+# fresh decode; revocation is checked separately on every call.
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAX_SIZE)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -25,20 +117,57 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    return jwt_backend.encode(to_encode)
+
+
+def _token_digest(token: str) -> str:
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+
+# Scope of tokens that only open the change feed; see create_stream_token
+STREAM_SCOPE = "stream"
+
+
+def create_stream_token(username: str, session_id: Optional[str]) -> str:
+    """Short-lived token for ``/tasks/stream``, which is passed in the URL.
+
+    It is scoped so that, should it leak through a URL in some log, it cannot
+    be used as an access token, and it ends with the session it came from.
+    """
+    return create_access_token(
+        data={"sub": username, "sid": session_id, "scope": STREAM_SCOPE},
+        expires_delta=timedelta(seconds=settings.STREAM_TOKEN_EXPIRE_SECONDS),
     )
-    return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[str]:
+def decode_access_token(
+    token: str,
+) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+    """(subject, session id, scope) of a valid token, or None; repeats hit the cache."""
+    digest = _token_digest(token)
+    claims = token_cache.get(digest)
+    if claims is not None:
+        return claims
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
-    except JWTError:
+        payload = jwt_backend.decode(token)
+    except jwt_backend.errors:
+        return None
+    username = payload.get("sub")
+    if username is None:
+        return None
+    claims = (username, payload.get("sid"), payload.get("scope"))
+    expires_in = payload.get("exp", 0) - time.time()
+    if expires_in > 0 and token_cache.maxsize > 0:
+        token_cache.set(digest, claims, ttl=expires_in)
+    return claims
+
+
+def verify_token(token: str, scope: Optional[str] = None) -> Optional[str]:
+    """Subject of a valid token whose session was not revoked, or None.
+
+    ``scope`` None accepts full access tokens only; scoped ones need a match.
+    """
+    claims = decode_access_token(token)
+    if claims is None or claims[1] in revoked_sessions or claims[2] != scope:
         return None
+    return claims[0]
@@ -0,0 +1,87 @@
+"""Shards holding task data, keyed by owner.
+
+Users, sessions and the ``user_shards`` directory stay on the primary
+database, which is also the shard named ``default``. ``SHARD_URLS`` adds
+further shards; each one holds the ``tasks`` and ``task_summaries`` rows of
+the users the directory assigns to it. Every task query is scoped by owner,
+so a user's tasks never span shards.
+"""
+from typing import Dict, List
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.core.cache import build_cache
+from app.core.config import settings
+from app.core.database import engine, get_engine_options
+from app.models.task import Task
+from app.models.task_summary import TaskSummary
+
+DEFAULT_SHARD = "default"
+
+# What moves with a user; created on every shard without the foreign keys
+# into ``users``, which only exists on the primary
+SHARDED_TABLES = (Task.__table__, TaskSummary.__table__)
+
+
+class ShardSet:
+    """Engines of all shards, the primary first as ``default``."""
+
+    def __init__(self, primary: Engine, urls: Dict[str, str]):
+        if DEFAULT_SHARD in urls:
+            raise ValueError(f"Shard name {DEFAULT_SHARD!r} is the primary database")
+        self.engines: Dict[str, Engine] = {DEFAULT_SHARD: primary}
+        for name, url in sorted(urls.items()):
+            self.engines[name] = create_engine(url, **get_engine_options(url))
+        self._sessionmaker = sessionmaker(autocommit=False, autoflush=False)
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.engines) > 1
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.engines)
+
+    def session(self, name: str) -> Session:
+        db = self._sessionmaker(bind=self.engines[name])
+        db.info["shard"] = name
+        return db
+
+    def create_schema(self) -> None:
+        """Create the sharded tables on every shard that lacks them."""
+        for name, shard in self.engines.items():
+            if name == DEFAULT_SHARD:
+                continue  # created with the rest of the primary schema
+            with shard.begin() as connection:
+                for table in SHARDED_TABLES:
+                    if inspect(connection).has_table(table.name):
+                        continue
+                    connection.execute(
+                        CreateTable(table, include_foreign_key_constraints=())
+                    )
+                    for index in table.indexes:
+                        connection.execute(CreateIndex(index))
+                    # Search index DDL hangs off this event (see app.models.task)
+                    table.dispatch.after_create(table, connection)
+
+    def dispose(self) -> None:
+        for name, shard in self.engines.items():
+            if name != DEFAULT_SHARD:
+                shard.dispose()
+
+
+if settings.SHARD_URLS and settings.ASYNC_DATABASE:
+    raise RuntimeError("SHARD_URLS is not supported together with ASYNC_DATABASE")
+
+shards = ShardSet(engine, settings.SHARD_URLS)
+
+# user id -> [shard name, moving]; a move waits this long for entries to lapse
+shard_map_cache = build_cache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.SHARD_MAP_CACHE_SECONDS,
+    redis_url=settings.USER_CACHE_REDIS_URL,
+    prefix="shard:",
+)
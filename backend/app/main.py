@@ -1,12 +1,65 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api.dependencies import require_internal_token
+from app.api.responses import FastJSONResponse
 from app.api.routes import api_router
-from app.core.database import Base, engine
+from app.core.concurrency import ConcurrencyLimitMiddleware
+from app.core.database import Base, SessionLocal, engine, get_pool_stats
 from app.core.config import settings
+from app.core.instrumentation import MetricsMiddleware, registry
+from app.core.ratelimit import RateLimitMiddleware
+from app.core.replicas import read_replicas
+from app.core.revocation import revoked_sessions
+from app.core.security import PasswordHasherBusy
+from app.core.sharding import shards
+from app.services.schema_service import upgrade_schema
+from app.services.task_service import TasksMoved
+from app.services.token_service import sync_revocations
+
+logger = logging.getLogger(__name__)
 
 
-# Create database tables
+# Create database tables, then bring tables from earlier releases up to date
 Base.metadata.create_all(bind=engine)
+shards.create_schema()
+for _shard_engine in shards.engines.values():
+    upgrade_schema(_shard_engine)
+
+
+def _sync_revocations() -> None:
+    with SessionLocal() as db:
+        sync_revocations(db)
+
+
+async def _every(seconds: float, job) -> None:
+    """Run the blocking ``job`` in the threadpool every ``seconds``."""
+    while True:
+        try:
+            await run_in_threadpool(job)
+        except Exception:
+            logger.exception("Background job %s failed", job.__name__)
+        await asyncio.sleep(seconds)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep this worker's revocation list current with logouts elsewhere
+    jobs = [_every(revoked_sessions.sync_interval, _sync_revocations)]
+    if read_replicas:
+        jobs.append(_every(settings.REPLICA_HEALTH_CHECK_SECONDS, read_replicas.check))
+    tasks = [asyncio.create_task(job) for job in jobs]
+    yield
+    for task in tasks:
+        task.cancel()
+    read_replicas.dispose()
+    shards.dispose()
+
 
 app = FastAPI(
     title="Vigilant Todo API",
@@ -14,8 +67,15 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
+# Overload protection runs inside CORS so browsers can read 429/503 replies;
+# per-client rate limits apply before a request may queue for a slot
+app.add_middleware(ConcurrencyLimitMiddleware)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -23,7 +83,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "Retry-After"],
 )
+# Outermost, so latency includes CORS handling and every response is counted
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(TasksMoved)
+async def tasks_moved_handler(request: Request, exc: TasksMoved):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
 
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
@@ -39,6 +121,26 @@ async def health_check():
     return {"status": "healthy", "service": "vigilant-todo-api"}
 
 
+@app.get(
+    "/internal/pool",
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+async def pool_stats():
+    """Live connection pool usage for sizing pools per deployment."""
+    return get_pool_stats()
+
+
+@app.get(
+    "/metrics",
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+async def metrics():
+    """Prometheus scrape endpoint (configure the scrape job's bearer token)."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # if __name__ == "__main__":
 #     import uvicorn
 
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from app.core.database import Base
+from app.models.task import utcnow
+
+
+class RefreshToken(Base):
+    """A refresh token, stored only as the SHA-256 digest of its value."""
+
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    # Shared by every rotation of one login; access tokens carry it as "sid"
+    session_id = Column(String(32), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), default=utcnow, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    # Set once the token is rotated or its session revoked
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
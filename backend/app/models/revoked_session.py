@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, String
+
+from app.core.database import Base
+from app.models.task import utcnow
+
+
+class RevokedSession(Base):
+    """A logged-out session whose access tokens must be refused until expiry."""
+
+    __tablename__ = "revoked_sessions"
+
+    session_id = Column(String(32), primary_key=True)
+    revoked_at = Column(
+        DateTime(timezone=True), default=utcnow, nullable=False, index=True
+    )
+    # Every access token of the session has expired by then
+    expires_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,10 +1,27 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from datetime import datetime, UTC
+
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+)
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
 
 
+def utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -13,8 +30,83 @@ class Task(Base):
     description = Column(Text, nullable=True)
     completed = Column(Boolean, default=False)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Populated client-side as well so every row carries microsecond precision,
+    # which keeps (created_at, id) keyset cursors stable across dialects.
+    created_at = Column(
+        DateTime(timezone=True),
+        default=utcnow,
+        server_default=func.now(),
+        nullable=False,
+    )
+    # Set on insert too, so "recently changed" listings never see NULLs
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+    # Deletes leave a tombstone so delta sync can report them; reaped later
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    # Owner's task version (see TaskSummary) as of this row's last change
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationship
     owner = relationship("User")
+
+    __table_args__ = (
+        # Backs keyset pagination: WHERE owner_id = ? AND (created_at, id) > (?, ?)
+        Index("ix_tasks_owner_created_id", "owner_id", "created_at", "id"),
+        # Backs completed/pending listings in creation order
+        Index(
+            "ix_tasks_owner_completed_created_id",
+            "owner_id",
+            "completed",
+            "created_at",
+            "id",
+        ),
+        # Backs updated_since filters and updated_at ordering
+        Index("ix_tasks_owner_updated_id", "owner_id", "updated_at", "id"),
+        # Backs delta sync: WHERE owner_id = ? AND version > ?
+        Index("ix_tasks_owner_version", "owner_id", "version"),
+    )
+
+
+# Full-text search index over title and description, maintained by the
+# database itself so every write path (ORM, bulk statements, imports) keeps
+# it current. SQLite uses an external-content FTS5 table kept in sync by
+# triggers; Postgres a generated tsvector column with a GIN index. Created
+# with the table, or by app.services.schema_service for existing tables.
+SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+        "title, description, content='tasks', content_rowid='id')",
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+        "INSERT INTO tasks_fts(rowid, title, description) "
+        "VALUES (new.id, new.title, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+        "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_au "
+        "AFTER UPDATE OF title, description ON tasks BEGIN "
+        "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO tasks_fts(rowid, title, description) "
+        "VALUES (new.id, new.title, new.description); END",
+    ],
+    "postgresql": [
+        "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+        ") STORED",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector "
+        "ON tasks USING GIN (search_vector)",
+    ],
+}
+
+for _dialect, _statements in SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(
+            Task.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect)
+        )
+
+event.listen(
+    Task.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"),
+)
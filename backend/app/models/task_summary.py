@@ -0,0 +1,25 @@
+from sqlalchemy import Column, ForeignKey, Integer, String
+
+from app.core.database import Base
+
+
+class TaskSummary(Base):
+    """Per-owner bookkeeping maintained alongside every task write.
+
+    Counters also default to 0 server-side, so schema upgrades can insert rows
+    with just ``owner_id`` and ``version``.
+    """
+
+    __tablename__ = "task_summaries"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # Bumped in the same transaction as each task write; drives ETags
+    version = Column(Integer, nullable=False, default=0)
+    # Highest version whose tombstones were reaped; older deltas are gone
+    purged_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Live (not deleted) task counts, moved by the same statements as version
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Integer, nullable=False, default=0, server_default="0")
+    # Shard the owner's tasks were moved to; left on the old shard so writes
+    # still in flight there are refused instead of recreating the owner
+    moved_to = Column(String, nullable=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+
+from app.core.database import Base
+
+
+class UserShard(Base):
+    """Which shard holds a user's tasks; lives on the primary database."""
+
+    __tablename__ = "user_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    shard = Column(String(64), nullable=False, index=True)
+    # Set while the user's tasks are copied to another shard; writes wait
+    moving = Column(Boolean, nullable=False, default=False)
@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
+from typing import Annotated, List, Literal, Optional, Union
+from pydantic import BaseModel, Field, field_validator
 
 
 class TaskBase(BaseModel):
@@ -18,6 +18,15 @@ class TaskUpdate(BaseModel):
     description: Optional[str] = None
     completed: Optional[bool] = None
 
+    @field_validator("title", "completed")
+    @classmethod
+    def not_null(cls, value):
+        # May be left out but not cleared: title is required and a null
+        # completed would fall out of the task counters
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
 
 class TaskResponse(TaskBase):
     id: int
@@ -27,3 +36,92 @@ class TaskResponse(TaskBase):
 
     class ConfigDict:
         from_attributes = True
+
+
+class TaskStats(BaseModel):
+    total: int
+    completed: int
+    pending: int
+    version: int
+
+
+class TaskQuery(BaseModel):
+    """Server-side filters and ordering for task listings."""
+
+    completed: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    updated_since: Optional[datetime] = None
+    order_by: Literal[
+        "created_at", "-created_at", "updated_at", "-updated_at"
+    ] = "created_at"
+
+
+class TaskBulkCreate(BaseModel):
+    op: Literal["create"]
+    task: TaskCreate
+
+
+class TaskBulkUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    task: TaskUpdate
+
+
+class TaskBulkDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+TaskBulkOperation = Annotated[
+    Union[TaskBulkCreate, TaskBulkUpdate, TaskBulkDelete], Field(discriminator="op")
+]
+
+
+class TaskBulkRequest(BaseModel):
+    operations: List[TaskBulkOperation] = Field(..., min_length=1, max_length=1000)
+
+
+class TaskBulkResult(BaseModel):
+    index: int
+    op: str
+    status: Literal["ok", "not_found"]
+    id: Optional[int] = None
+    task: Optional[TaskResponse] = None
+
+
+class TaskBulkResponse(BaseModel):
+    results: List[TaskBulkResult]
+
+
+class TaskChange(TaskResponse):
+    version: int
+    deleted_at: Optional[datetime] = None
+
+
+class TaskChangesResponse(BaseModel):
+    # Pass back as ``since`` on the next sync
+    version: int
+    has_more: bool
+    changes: List[TaskChange]
+
+
+class StreamToken(BaseModel):
+    # Pass as ``token`` to /tasks/stream, which EventSource can't send headers to
+    token: str
+    # Lifetime in seconds; get a new token to reconnect after that
+    expires_in: int
+
+
+class TaskImportError(BaseModel):
+    line: int
+    error: str
+
+
+class TaskImportResult(BaseModel):
+    imported: int
+    failed: int
+    # First errors only; ``failed`` has the full count
+    errors: List[TaskImportError]
+    # Task version after the last imported batch
+    version: Optional[int] = None
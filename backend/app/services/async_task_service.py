@@ -0,0 +1,52 @@
+"""AsyncSession counterparts of :mod:`app.services.task_service`.
+
+Each function runs the sync implementation through ``AsyncSession.run_sync``,
+which drives the ORM on the async driver without blocking the event loop, so
+both request paths share one set of queries and write-side bookkeeping.
+"""
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.task import TaskCreate, TaskQuery, TaskUpdate
+from app.services import task_service
+
+
+async def get_task_version(db: AsyncSession, user_id: int) -> int:
+    return await db.run_sync(task_service.get_task_version, user_id)
+
+
+async def get_task_rows(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    filters: Optional[TaskQuery] = None,
+):
+    return await db.run_sync(
+        task_service.get_task_rows,
+        user_id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        filters=filters,
+    )
+
+
+async def get_task_by_id(db: AsyncSession, task_id: int, user_id: int):
+    return await db.run_sync(task_service.get_task_by_id, task_id, user_id)
+
+
+async def create_task(db: AsyncSession, task: TaskCreate, user_id: int):
+    return await db.run_sync(task_service.create_task, task, user_id)
+
+
+async def update_task(
+    db: AsyncSession, task_id: int, task_update: TaskUpdate, user_id: int
+):
+    return await db.run_sync(task_service.update_task, task_id, task_update, user_id)
+
+
+async def delete_task(db: AsyncSession, task_id: int, user_id: int):
+    return await db.run_sync(task_service.delete_task, task_id, user_id)
@@ -0,0 +1,59 @@
+"""AsyncSession counterparts of :mod:`app.services.user_service`.
+
+bcrypt is CPU-bound, so hashing and verification are awaited on the bcrypt
+worker pool instead of running on the event loop.
+"""
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import aget_password_hash, averify_and_update_password
+from app.models.user import User
+from app.schemas.user import UserCreate
+
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+
+async def get_user_by_username_or_email(db: AsyncSession, username: str, email: str):
+    result = await db.execute(
+        select(User.username, User.email).where(
+            or_(User.username == username, User.email == email)
+        )
+    )
+    return result.first()
+
+
+async def create_user(db: AsyncSession, user: UserCreate):
+    hashed_password = await aget_password_hash(user.password)
+    db_user = User(
+        email=user.email,
+        username=user.username,
+        full_name=user.full_name,
+        hashed_password=hashed_password,
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user_by_username(db, username)
+    if not user:
+        return False
+    verified, new_hash = await averify_and_update_password(
+        password, user.hashed_password
+    )
+    if not verified:
+        return False
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    return user
@@ -0,0 +1,175 @@
+"""In-place upgrades for databases created by earlier releases.
+
+``Base.metadata.create_all`` creates missing tables but never changes ones
+that already exist, so columns, indexes and search structures added to
+existing tables since are applied here. Every step inspects the live schema
+first: rerunning the upgrade, or running it on an up-to-date database,
+changes nothing. It runs on startup and as ``python -m app.cli upgrade-db``.
+"""
+
+from typing import List
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.models.task import SEARCH_DDL, Task
+from app.models.task_summary import TaskSummary
+from app.services.task_service import rebuild_task_stats
+
+
+def _add_columns(connection: Connection, table, names) -> List[str]:
+    """Add the model columns ``names`` missing from ``table``; returns those added.
+
+    NOT NULL columns are added with ``DEFAULT 0``, the only kind added so far
+    being integer counters and versions.
+    """
+    present = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    preparer = connection.dialect.identifier_preparer
+    added = []
+    for name in names:
+        if name in present:
+            continue
+        column = table.columns[name]
+        ddl = (
+            f"ALTER TABLE {preparer.format_table(table)} "
+            f"ADD COLUMN {preparer.format_column(column)} "
+            f"{column.type.compile(connection.dialect)}"
+        )
+        if not column.nullable:
+            ddl += " DEFAULT 0 NOT NULL"
+        connection.exec_driver_sql(ddl)
+        added.append(name)
+    return added
+
+
+def _add_task_sync_columns(connection: Connection) -> List[str]:
+    """Soft deletes, per-row versions and the reaping watermark for delta sync."""
+    added = _add_columns(connection, Task.__table__, ["deleted_at", "version"])
+    purged = _add_columns(connection, TaskSummary.__table__, ["purged_version"])
+    if "version" in added:
+        # Give every existing task a version of its own above anything
+        # clients have synced from, so the first delta sync after the upgrade
+        # pages through them like any other changes.
+        connection.exec_driver_sql(
+            "INSERT INTO task_summaries (owner_id, version) "
+            "SELECT DISTINCT owner_id, 0 FROM tasks WHERE owner_id NOT IN "
+            "(SELECT owner_id FROM task_summaries)"
+        )
+        connection.exec_driver_sql(
+            "UPDATE tasks SET version = ranked.version FROM ("
+            "SELECT tasks.id, task_summaries.version + ROW_NUMBER() OVER "
+            "(PARTITION BY tasks.owner_id ORDER BY tasks.id) AS version "
+            "FROM tasks JOIN task_summaries USING (owner_id)"
+            ") AS ranked WHERE ranked.id = tasks.id"
+        )
+        connection.exec_driver_sql(
+            "UPDATE task_summaries SET version = task_summaries.version + "
+            "counted.tasks FROM (SELECT owner_id, COUNT(*) AS tasks FROM tasks "
+            "GROUP BY owner_id) AS counted WHERE counted.owner_id = task_summaries.owner_id"
+        )
+    return [f"tasks.{name}" for name in added] + [
+        f"task_summaries.{name}" for name in purged
+    ]
+
+
+def _normalize_task_timestamps(connection: Connection) -> List[str]:
+    """SQLite timestamps stored without microseconds by earlier releases.
+
+    SQLite keeps datetimes as text and compares them as text, and SQLAlchemy
+    writes (and binds keyset cursor values) as ``YYYY-MM-DD HH:MM:SS.ffffff``.
+    Rows filled by the old ``CURRENT_TIMESTAMP`` default lack the fraction, so
+    ``"... 12:00:00" < "... 12:00:00.000000"`` and cursors skip them.
+    """
+    if connection.dialect.name != "sqlite":
+        return []
+    changed = []
+    for name in ("created_at", "updated_at"):
+        result = connection.exec_driver_sql(
+            f"UPDATE tasks SET {name} = {name} || '.000000' WHERE length({name}) = 19"
+        )
+        if result.rowcount:
+            changed.append(f"tasks.{name}")
+    return changed
+
+
+def _backfill_task_updated_at(connection: Connection) -> List[str]:
+    """``updated_at`` for tasks earlier releases never set it on.
+
+    A NULL sorts first, can't be a keyset cursor value and never matches
+    ``updated_since``; a task that was never changed was last updated when it
+    was created.
+    """
+    result = connection.exec_driver_sql(
+        "UPDATE tasks SET updated_at = created_at WHERE updated_at IS NULL"
+    )
+    return ["tasks.updated_at"] if result.rowcount else []
+
+
+def _add_task_counters(connection: Connection) -> List[str]:
+    """Live task counters, seeded by counting every owner's tasks."""
+    added = _add_columns(connection, TaskSummary.__table__, ["total", "completed"])
+    if added:
+        # The session joins the step's transaction rather than committing it
+        rebuild_task_stats(Session(bind=connection))
+    return [f"task_summaries.{name}" for name in added]
+
+
+def _add_task_move_marker(connection: Connection) -> List[str]:
+    """The marker shard moves leave on the shard a user moved off."""
+    added = _add_columns(connection, TaskSummary.__table__, ["moved_to"])
+    return [f"task_summaries.{name}" for name in added]
+
+
+def _add_task_indexes(connection: Connection) -> List[str]:
+    """Composite indexes behind keyset pagination, filters and delta sync."""
+    present = {index["name"] for index in inspect(connection).get_indexes("tasks")}
+    added = []
+    for index in sorted(Task.__table__.indexes, key=lambda index: index.name):
+        if index.name not in present:
+            index.create(connection)
+            added.append(index.name)
+    return added
+
+
+def _add_task_search(connection: Connection) -> List[str]:
+    """The full-text search index, filled from the existing tasks."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        if inspect(connection).has_table("tasks_fts"):
+            return []
+        for statement in SEARCH_DDL[dialect]:
+            connection.exec_driver_sql(statement)
+        # External-content FTS5 tables start empty; index the existing rows
+        connection.exec_driver_sql("INSERT INTO tasks_fts(tasks_fts) VALUES('rebuild')")
+        return ["tasks_fts"]
+    if dialect == "postgresql":
+        columns = inspect(connection).get_columns("tasks")
+        if any(column["name"] == "search_vector" for column in columns):
+            return []
+        # The generated column is computed for existing rows as it is added
+        for statement in SEARCH_DDL[dialect]:
+            connection.exec_driver_sql(statement)
+        return ["tasks.search_vector"]
+    return []
+
+
+# Applied in order, each in its own transaction
+STEPS = [
+    _add_task_sync_columns,
+    _normalize_task_timestamps,
+    _backfill_task_updated_at,
+    _add_task_counters,
+    _add_task_move_marker,
+    _add_task_indexes,
+    _add_task_search,
+]
+
+
+def upgrade_schema(engine: Engine) -> List[str]:
+    """Bring the task tables on ``engine`` up to date; returns what changed."""
+    applied = []
+    for step in STEPS:
+        with engine.begin() as connection:
+            applied += step(connection)
+    return applied
@@ -0,0 +1,268 @@
+"""User placement on task shards and moving users between them."""
+
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.events import change_feed
+from app.core import sharding
+from app.core.sharding import DEFAULT_SHARD, shard_map_cache
+from app.models.task import Task
+from app.models.task_summary import TaskSummary
+from app.models.user_shard import UserShard
+
+# Copied to the target shard; ids and versions are assigned afresh there
+_MOVED_COLUMNS = (
+    Task.title,
+    Task.description,
+    Task.completed,
+    Task.created_at,
+    Task.updated_at,
+)
+
+
+def _place_user(db: Session, user_id: int) -> UserShard:
+    """Record a shard for a user seen for the first time."""
+    if db.get(TaskSummary, user_id) is not None:
+        # Wrote tasks before sharding was enabled; they are on the primary
+        name = DEFAULT_SHARD
+    else:
+        candidates = settings.SHARDS_FOR_NEW_USERS or sharding.shards.names
+        name = candidates[user_id % len(candidates)]
+    try:
+        db.add(UserShard(user_id=user_id, shard=name))
+        db.commit()
+    except IntegrityError:
+        # Placed by a concurrent request
+        db.rollback()
+    return db.get(UserShard, user_id)
+
+
+def resolve_shard(db: Session, user_id: int) -> Tuple[str, bool]:
+    """(shard name, moving) for a user, placing them on first use."""
+    cached = shard_map_cache.get(str(user_id))
+    if cached is not None:
+        return cached[0], cached[1]
+    row = db.get(UserShard, user_id) or _place_user(db, user_id)
+    shard_map_cache.set(str(user_id), [row.shard, row.moving])
+    return row.shard, row.moving
+
+
+def shard_session(db: Session, name: str) -> Session:
+    """``db`` itself for the primary, else a new session on shard ``name``."""
+    return db if name == DEFAULT_SHARD else sharding.shards.session(name)
+
+
+def _set_location(db: Session, row: UserShard, shard: str, moving: bool) -> None:
+    row.shard, row.moving = shard, moving
+    db.commit()
+    shard_map_cache.delete(str(row.user_id))
+
+
+class MoveConflict(RuntimeError):
+    """Raised when writes keep landing on the source shard during a move."""
+
+
+def move_user(
+    db: Session,
+    user_id: int,
+    target: str,
+    settle_seconds: float = settings.SHARD_MAP_CACHE_SECONDS,
+    batch_size: int = 1000,
+    attempts: int = 3,
+) -> int:
+    """Move a user's live tasks to shard ``target``; returns how many moved.
+
+    Writes are refused (503) while the copy runs; ``settle_seconds`` gives
+    every worker time to see that before copying starts. A write that began
+    earlier and commits during the copy moves the source version on, and the
+    copy is redone, up to ``attempts`` times. Once a copy is complete the
+    source is marked as moved, which refuses any write still reaching it, and
+    the directory switches to ``target``. The source rows are deleted only
+    after another ``settle_seconds``, so workers still routing reads there
+    from their cached shard map keep getting answers. The target shard
+    assigns new task ids, and the user's version jumps past every moved row
+    with older deltas expired, so clients get 410 from delta sync (and a
+    ``reset`` event on the change feed) and refetch. Rerunning after a
+    failure is safe: a half-written copy is discarded first.
+    """
+    if target not in sharding.shards.engines:
+        raise ValueError(f"Unknown shard {target!r}")
+    source, _ = resolve_shard(db, user_id)
+    row = db.get(UserShard, user_id)
+    if source == target:
+        return 0
+    _set_location(db, row, source, moving=True)
+    time.sleep(settle_seconds)
+    src = shard_session(db, source)
+    dst = shard_session(db, target)
+    try:
+        try:
+            _ensure_summary(src, user_id)
+            for _ in range(attempts):
+                copied, version, moved = _copy_tasks(src, dst, user_id, batch_size)
+                if _fence_source(src, user_id, copied, target):
+                    break
+                src.rollback()
+            else:
+                raise MoveConflict(f"User {user_id} kept writing during the move")
+            _set_location(db, row, target, moving=False)
+        except BaseException:
+            src.rollback()
+            dst.rollback()
+            _unfence_source(src, user_id)
+            _set_location(db, row, source, moving=False)
+            raise
+        time.sleep(settle_seconds)
+        _release_source(src, user_id)
+    finally:
+        for session in (src, dst):
+            if session is not db:
+                session.close()
+    change_feed.publish(user_id, {"id": version, "type": "reset"})
+    return moved
+
+
+def _ensure_summary(src: Session, user_id: int) -> None:
+    """Give the user a summary row on ``src`` for the move to check against."""
+    if src.get(TaskSummary, user_id) is not None:
+        return
+    try:
+        src.add(TaskSummary(owner_id=user_id))
+        src.commit()
+    except IntegrityError:
+        # Created by a concurrent write
+        src.rollback()
+
+
+def _fence_source(src: Session, user_id: int, copied: int, target: str) -> bool:
+    """Mark the user as moved on ``src`` unless writes landed since the copy.
+
+    Every write bumps the summary row first, so marking it only at the copied
+    version both detects late writes and, once committed, refuses later ones
+    (see ``_bump_version``).
+    """
+    fenced = src.execute(
+        update(TaskSummary)
+        .where(
+            TaskSummary.owner_id == user_id,
+            TaskSummary.version == copied,
+            TaskSummary.moved_to.is_(None),
+        )
+        .values(moved_to=target)
+    ).rowcount
+    if fenced:
+        src.commit()
+    return bool(fenced)
+
+
+def _unfence_source(src: Session, user_id: int) -> None:
+    """Let writes reach ``src`` again after a move that did not complete."""
+    src.execute(
+        update(TaskSummary).where(TaskSummary.owner_id == user_id).values(moved_to=None)
+    )
+    src.commit()
+
+
+def _release_source(src: Session, user_id: int) -> None:
+    """Delete the user's tasks on ``src``, keeping the moved summary row.
+
+    The marked row stays behind for writes routed by a stale shard map to
+    bounce off; moving the user back replaces it.
+    """
+    src.execute(delete(Task).where(Task.owner_id == user_id))
+    src.execute(
+        update(TaskSummary)
+        .where(TaskSummary.owner_id == user_id)
+        .values(total=0, completed=0)
+    )
+    src.commit()
+
+
+def _copy_tasks(src: Session, dst: Session, user_id: int, batch_size: int):
+    """Copy live tasks and counters to ``dst``.
+
+    Returns (source version copied, new version, count).
+    """
+    copied = version = src.get(TaskSummary, user_id).version
+    # Leftovers of an interrupted earlier move
+    dst.execute(delete(Task).where(Task.owner_id == user_id))
+    dst.execute(delete(TaskSummary).where(TaskSummary.owner_id == user_id))
+    moved = completed = 0
+    rows = src.execute(
+        select(*_MOVED_COLUMNS)
+        .where(Task.owner_id == user_id, Task.deleted_at.is_(None))
+        .order_by(Task.created_at, Task.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for partition in rows.partitions():
+        batch = [row._asdict() for row in partition]
+        for values in batch:
+            moved += 1
+            completed += bool(values["completed"])
+            values.update(owner_id=user_id, version=version + moved)
+        dst.execute(insert(Task), batch)
+    version += moved
+    # Everything before the move is gone from this shard's point of view
+    dst.add(
+        TaskSummary(
+            owner_id=user_id,
+            version=version,
+            purged_version=version,
+            total=moved,
+            completed=completed,
+        )
+    )
+    dst.commit()
+    return copied, version, moved
+
+
+def shard_loads(db: Session) -> Dict[str, List[Tuple[int, int]]]:
+    """Per shard, the ``(user_id, live task count)`` of each user placed there."""
+    directory = dict(db.execute(select(UserShard.user_id, UserShard.shard)).all())
+    loads = {name: [] for name in sharding.shards.names}
+    for name in sharding.shards.names:
+        shard = shard_session(db, name)
+        try:
+            counts = shard.execute(
+                select(TaskSummary.owner_id, TaskSummary.total)
+            ).all()
+        finally:
+            if shard is not db:
+                shard.close()
+        # Users without a directory entry yet are still on the primary
+        loads[name] += [
+            (owner_id, total)
+            for owner_id, total in counts
+            if directory.get(owner_id, DEFAULT_SHARD) == name
+        ]
+    return loads
+
+
+def plan_rebalance(db: Session) -> List[Tuple[int, str, str, int]]:
+    """Moves ``(user_id, source, target, tasks)`` evening out live task counts.
+
+    Greedily moves the largest user that narrows the gap between the fullest
+    shard and the emptiest shard open to new users, until no move helps.
+    """
+    loads = shard_loads(db)
+    totals = {name: sum(total for _, total in users) for name, users in loads.items()}
+    targets = settings.SHARDS_FOR_NEW_USERS or sharding.shards.names
+    moves = []
+    while True:
+        heavy = max(totals, key=totals.get)
+        light = min(targets, key=totals.get)
+        gap = totals[heavy] - totals[light]
+        movable = [user for user in loads[heavy] if 0 < user[1] <= gap // 2]
+        if heavy == light or not movable:
+            return moves
+        user_id, total = max(movable, key=lambda user: user[1])
+        loads[heavy].remove((user_id, total))
+        loads[light].append((user_id, total))
+        totals[heavy] -= total
+        totals[light] += total
+        moves.append((user_id, heavy, light, total))
@@ -0,0 +1,96 @@
+"""Encoding of task rows for bulk export and parsing of bulk imports."""
+import csv
+import io
+import os
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+import orjson
+
+from app.services.task_service import TASK_RESPONSE_COLUMNS
+
+EXPORT_FIELDS = [column.key for column in TASK_RESPONSE_COLUMNS]
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+IMPORT_FORMATS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+
+
+def ndjson_chunks(batches: Iterable[Sequence]) -> Iterator[bytes]:
+    """One JSON object per line, one chunk per batch of rows."""
+    option = orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE
+    for batch in batches:
+        yield b"".join(orjson.dumps(row._asdict(), option=option) for row in batch)
+
+
+def csv_chunks(batches: Iterable[Sequence]) -> Iterator[bytes]:
+    """CSV with a header row, one chunk per batch of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        writer.writerows(_csv_row(row) for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()  # header only: no tasks
+
+
+def _csv_row(row) -> list:
+    return [_csv_value(value) for value in row]
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def import_format(filename: Optional[str], default: str = "ndjson") -> str:
+    """Import format implied by a file name's extension."""
+    suffix = os.path.splitext(filename or "")[1].lower()
+    return IMPORT_FORMATS.get(suffix, default)
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[Tuple[int, Optional[dict], str]]:
+    """``(line, data, error)`` for every non-blank line of NDJSON."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = orjson.loads(line)
+        except orjson.JSONDecodeError as exc:
+            yield number, None, f"invalid JSON: {exc}"
+            continue
+        if not isinstance(data, dict):
+            yield number, None, "expected a JSON object"
+            continue
+        yield number, data, None
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[Tuple[int, Optional[dict], str]]:
+    """``(line, data, error)`` for every record of a CSV file with a header row.
+
+    Empty cells are left out so the field defaults apply, which makes an
+    export round-trip cleanly; unknown columns are ignored by validation.
+    """
+    reader = csv.DictReader(lines)
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            yield reader.line_num, None, f"invalid CSV: {exc}"
+            return
+        if None in record:
+            yield reader.line_num, None, "more cells than header columns"
+            continue
+        yield reader.line_num, {k: v for k, v in record.items() if v}, None
+
+
+PARSERS = {"ndjson": parse_ndjson, "csv": parse_csv}
@@ -1,41 +1,699 @@
+from datetime import datetime, UTC
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from sqlalchemy import (
+    case,
+    column,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
-from app.models.task import Task
-from app.schemas.task import TaskCreate, TaskUpdate
+from app.core.events import change_feed
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.core.replicas import note_write
+from app.core.sharding import shard_map_cache
+from app.models.task import Task, utcnow
+from app.models.task_summary import TaskSummary
+from app.schemas.task import (
+    TaskBulkCreate,
+    TaskBulkDelete,
+    TaskBulkOperation,
+    TaskBulkResult,
+    TaskBulkUpdate,
+    TaskCreate,
+    TaskImportError,
+    TaskImportResult,
+    TaskQuery,
+    TaskResponse,
+    TaskUpdate,
+)
+
+
+class ChangesExpired(LookupError):
+    """Raised when a delta sync reaches back past reaped tombstones."""
+
+
+class TasksMoved(RuntimeError):
+    """Raised when a write reaches a shard the owner's tasks were moved off."""
+
+
+def _upsert(db: Session, model):
+    """Dialect-specific INSERT supporting ON CONFLICT for ``model``."""
+    dialect = db.get_bind().dialect.name
+    return (postgresql.insert if dialect == "postgresql" else sqlite.insert)(model)
+
+
+def _bump_version(db: Session, user_id: int, count: int = 1, total=0, completed=0):
+    """Advance the owner's change version by ``count`` and return the new value.
+
+    ``total`` and ``completed`` are added to the owner's live task counters in
+    the same statement; they may be SQL expressions. Runs inside the caller's
+    transaction so the summary moves atomically with the task rows it describes.
+    Raises :class:`TasksMoved` on a shard the owner has moved off, so a write
+    routed by a stale shard map stops before touching any task rows.
+    """
+    stmt = _upsert(db, TaskSummary).values(
+        owner_id=user_id, version=count, total=total, completed=completed
+    )
+    note_write(user_id)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TaskSummary.owner_id],
+        set_={
+            "version": TaskSummary.version + count,
+            "total": TaskSummary.total + total,
+            "completed": TaskSummary.completed + completed,
+        },
+        where=TaskSummary.moved_to.is_(None),
+    )
+    version = db.scalar(stmt.returning(TaskSummary.version))
+    if version is None:
+        # Let this worker's next request look the user's shard up afresh
+        shard_map_cache.delete(str(user_id))
+        raise TasksMoved("Tasks are being moved, retry shortly")
+    return version
+
+
+def _if_live(task_id: int, user_id: int, delta: int, *criteria):
+    """``delta`` if the task is live and matches ``criteria``, else 0.
+
+    Evaluated by the version bump, before the task write it accounts for.
+    """
+    found = (
+        select(Task.id)
+        .where(
+            Task.id == task_id,
+            Task.owner_id == user_id,
+            Task.deleted_at.is_(None),
+            *criteria,
+        )
+        .exists()
+    )
+    return case((found, delta), else_=0)
+
 
+def _live_counts(db: Session, user_id: int, task_ids) -> tuple:
+    """(total, completed) over the given tasks that are currently live."""
+    if not task_ids:
+        return 0, 0
+    total, completed = db.execute(
+        select(
+            func.count(), func.coalesce(func.sum(case((Task.completed, 1))), 0)
+        ).where(
+            Task.owner_id == user_id,
+            Task.id.in_(task_ids),
+            Task.deleted_at.is_(None),
+        )
+    ).one()
+    return total, completed
 
-def get_tasks(db: Session, user_id: int, skip: int = 0, limit: int = 100):
+
+_CHANGE_TYPES = {"create": "created", "update": "updated", "delete": "deleted"}
+
+
+def _publish(user_id: int, version: int, change: str, db_task=None, task_id=None):
+    """Announce a committed change on the user's change feed."""
+    event = {"id": version, "type": change}
+    if db_task is not None:
+        task = db_task
+        if not isinstance(task, TaskResponse):
+            task = TaskResponse.model_validate(db_task, from_attributes=True)
+        event["task"] = task.model_dump(mode="json")
+    else:
+        event["task_id"] = task_id
+    change_feed.publish(user_id, event)
+
+
+def get_task_version(db: Session, user_id: int) -> int:
+    """Current change version of a user's tasks; 0 before the first write."""
+    version = db.scalar(
+        select(TaskSummary.version).where(TaskSummary.owner_id == user_id)
+    )
+    return version or 0
+
+
+def get_task_stats(db: Session, user_id: int) -> dict:
+    """Task counts from the owner's summary row; one primary-key lookup."""
+    row = db.execute(
+        select(TaskSummary.version, TaskSummary.total, TaskSummary.completed).where(
+            TaskSummary.owner_id == user_id
+        )
+    ).first()
+    version, total, completed = row or (0, 0, 0)
+    return {
+        "version": version,
+        "total": total,
+        "completed": completed,
+        "pending": total - completed,
+    }
+
+
+def _counted_tasks():
     return (
-        db.query(Task).filter(Task.owner_id == user_id).offset(skip).limit(limit).all()
+        select(
+            Task.owner_id,
+            func.count().label("total"),
+            func.coalesce(func.sum(case((Task.completed, 1))), 0).label("completed"),
+        )
+        .where(Task.deleted_at.is_(None))
+        .group_by(Task.owner_id)
+        .subquery()
+    )
+
+
+def check_task_stats(db: Session) -> list:
+    """Owners whose stored counters disagree with their tasks.
+
+    Returns ``(owner_id, (total, completed) stored, (total, completed) actual)``
+    tuples. This scans every task and is meant for maintenance, not requests.
+    """
+    counted = _counted_tasks()
+    stored_total = func.coalesce(TaskSummary.total, 0)
+    stored_completed = func.coalesce(TaskSummary.completed, 0)
+    actual_total = func.coalesce(counted.c.total, 0)
+    actual_completed = func.coalesce(counted.c.completed, 0)
+    owner_id = func.coalesce(TaskSummary.owner_id, counted.c.owner_id)
+    rows = db.execute(
+        select(
+            owner_id,
+            stored_total,
+            stored_completed,
+            actual_total,
+            actual_completed,
+        )
+        .select_from(TaskSummary)
+        .join(counted, counted.c.owner_id == TaskSummary.owner_id, full=True)
+        .where(or_(stored_total != actual_total, stored_completed != actual_completed))
+        .order_by(owner_id)
+    ).all()
+    return [(row[0], tuple(row[1:3]), tuple(row[3:5])) for row in rows]
+
+
+def rebuild_task_stats(db: Session) -> int:
+    """Recount the owners whose counters drifted; returns how many were fixed.
+
+    Each owner is recounted inside the statement that writes the counters, so
+    tasks written since the check are included. Version (and so ETags) is
+    left alone.
+    """
+    mismatches = check_task_stats(db)
+    for owner_id, _, _ in mismatches:
+        live = (Task.owner_id == owner_id, Task.deleted_at.is_(None))
+        total = select(func.count()).where(*live).scalar_subquery()
+        completed = (
+            select(func.count()).where(*live, Task.completed.is_(True))
+        ).scalar_subquery()
+        stmt = _upsert(db, TaskSummary).values(
+            owner_id=owner_id, total=total, completed=completed
+        )
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[TaskSummary.owner_id],
+                set_={"total": total, "completed": completed},
+            )
+        )
+    db.commit()
+    return len(mismatches)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Naive datetimes are taken as UTC, which is how timestamps are stored
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(UTC)
+
+
+# What TaskResponse exposes, in field order
+TASK_RESPONSE_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.completed,
+    Task.owner_id,
+    Task.created_at,
+    Task.updated_at,
+)
+
+
+def get_tasks(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    filters: Optional[TaskQuery] = None,
+):
+    return _list_tasks(db.query(Task), user_id, skip, limit, cursor, filters).all()
+
+
+def get_task_rows(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    filters: Optional[TaskQuery] = None,
+):
+    """Like :func:`get_tasks`, but plain rows of :data:`TASK_RESPONSE_COLUMNS`.
+
+    Skips ORM identity-map bookkeeping and per-attribute instrumentation, so
+    listings can be serialized straight from ``row._asdict()``.
+    """
+    query = db.query(*TASK_RESPONSE_COLUMNS)
+    return _list_tasks(query, user_id, skip, limit, cursor, filters).all()
+
+
+def iter_task_rows(db: Session, user_id: int, batch_size: int = 1000):
+    """Every live task of a user as lists of rows, ``batch_size`` at a time.
+
+    Rows come from a single streamed SELECT (a server-side cursor where the
+    driver has one), so memory is bounded by ``batch_size`` rather than by
+    how many tasks the user has.
+    """
+    result = db.execute(
+        select(*TASK_RESPONSE_COLUMNS)
+        .where(Task.owner_id == user_id, Task.deleted_at.is_(None))
+        .order_by(Task.id)
+        .execution_options(yield_per=batch_size)
     )
+    for batch in result.partitions():
+        yield batch
+
+
+def _list_tasks(query, user_id, skip, limit, cursor, filters):
+    filters = filters or TaskQuery()
+    query = query.filter(Task.owner_id == user_id, Task.deleted_at.is_(None))
+    if filters.completed is not None:
+        query = query.filter(Task.completed == filters.completed)
+    if filters.created_after is not None:
+        query = query.filter(Task.created_at > _as_utc(filters.created_after))
+    if filters.created_before is not None:
+        query = query.filter(Task.created_at < _as_utc(filters.created_before))
+    if filters.updated_since is not None:
+        query = query.filter(Task.updated_at >= _as_utc(filters.updated_since))
+
+    descending = filters.order_by.startswith("-")
+    sort_column = getattr(Task, filters.order_by.lstrip("-"))
+    if descending:
+        query = query.order_by(sort_column.desc(), Task.id.desc())
+    else:
+        query = query.order_by(sort_column, Task.id)
+
+    if cursor:
+        # Keyset mode: seek straight to the position after the cursor using
+        # the (owner_id, ..., <sort column>, id) indexes instead of scanning
+        # skipped rows.
+        order_by, sort_value, task_id = decode_cursor(cursor, size=3)
+        if (
+            order_by != filters.order_by
+            or not isinstance(sort_value, datetime)
+            or not isinstance(task_id, int)
+        ):
+            raise InvalidCursor("Invalid pagination cursor")
+        position = tuple_(sort_column, Task.id)
+        if descending:
+            query = query.filter(position < (sort_value, task_id))
+        else:
+            query = query.filter(position > (sort_value, task_id))
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def task_cursor(db_task: Task, filters: Optional[TaskQuery] = None) -> str:
+    """Cursor for the listing page that follows ``db_task`` (a task or row)."""
+    order_by = (filters or TaskQuery()).order_by
+    return encode_cursor(order_by, getattr(db_task, order_by.lstrip("-")), db_task.id)
+
+
+def _fts5_query(q: str) -> str:
+    """Quote every term so user input can't inject FTS5 query syntax."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def search_tasks(
+    db: Session,
+    user_id: int,
+    q: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+):
+    """Full-text search over title and description, best match first.
+
+    Returns ``(task, score)`` rows where a lower score is a better match;
+    ``(score, id)`` of the last row is the keyset for the next page.
+    """
+    if not q.split():
+        return []
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        fts = table("tasks_fts", column("rowid"), column("rank"))
+        score = fts.c.rank
+        query = (
+            db.query(Task, score)
+            .join(fts, fts.c.rowid == Task.id)
+            .filter(literal_column("tasks_fts").op("MATCH")(_fts5_query(q)))
+        )
+    elif dialect == "postgresql":
+        tsquery = func.websearch_to_tsquery("english", q)
+        vector = literal_column("tasks.search_vector")
+        score = -func.ts_rank_cd(vector, tsquery)
+        query = db.query(Task, score).filter(vector.op("@@")(tsquery))
+    else:
+        pattern = f"%{q}%"
+        score = literal(0.0)
+        query = db.query(Task, score).filter(
+            or_(Task.title.ilike(pattern), Task.description.ilike(pattern))
+        )
+    query = query.filter(Task.owner_id == user_id, Task.deleted_at.is_(None))
+    if cursor:
+        last_score, task_id = decode_cursor(cursor)
+        if not isinstance(last_score, (int, float)) or not isinstance(task_id, int):
+            raise InvalidCursor("Invalid pagination cursor")
+        query = query.filter(tuple_(score, Task.id) > (last_score, task_id))
+    return query.order_by(score, Task.id).limit(limit).all()
 
 
 def get_task_by_id(db: Session, task_id: int, user_id: int):
-    return db.query(Task).filter(Task.id == task_id, Task.owner_id == user_id).first()
+    return (
+        db.query(Task)
+        .filter(Task.id == task_id, Task.owner_id == user_id, Task.deleted_at.is_(None))
+        .first()
+    )
 
 
 def create_task(db: Session, task: TaskCreate, user_id: int):
-    db_task = Task(**task.model_dump(), owner_id=user_id)
+    version = _bump_version(db, user_id, total=1, completed=int(task.completed))
+    db_task = Task(**task.model_dump(), owner_id=user_id, version=version)
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
+    _publish(user_id, version, "created", db_task)
     return db_task
 
 
+def _update_owned_task(db: Session, task_id: int, user_id: int, values: dict):
+    """UPDATE ... WHERE id = ? AND owner_id = ? RETURNING *, in one statement."""
+    return db.scalars(
+        update(Task)
+        .where(Task.id == task_id, Task.owner_id == user_id, Task.deleted_at.is_(None))
+        .values(**values)
+        .returning(Task)
+    ).first()
+
+
 def update_task(db: Session, task_id: int, task_update: TaskUpdate, user_id: int):
-    db_task = get_task_by_id(db, task_id, user_id)
-    if db_task:
-        update_date = task_update.model_dump(exclude_unset=True)
-        for field, value in update_date.items():
-            setattr(db_task, field, value)
-            db.commit()
-            db.refresh(db_task)
+    values = task_update.model_dump(exclude_unset=True)
+    if not values:
+        return get_task_by_id(db, task_id, user_id)
+    # Taking the version first locks the owner's summary row, so concurrent
+    # writers for one user commit in version order.
+    completed = 0
+    if values.get("completed") is not None:
+        new = values["completed"]
+        completed = _if_live(task_id, user_id, 1 if new else -1, Task.completed != new)
+    version = _bump_version(db, user_id, completed=completed)
+    db_task = _update_owned_task(db, task_id, user_id, {**values, "version": version})
+    if db_task is None:
+        db.rollback()
+        return None
+    # RETURNING already loaded every column; detach so the commit doesn't
+    # expire them and force a reload when the response is serialized.
+    db.expunge(db_task)
+    db.commit()
+    _publish(user_id, version, "updated", db_task)
     return db_task
 
 
 def delete_task(db: Session, task_id: int, user_id: int):
-    db_task = get_task_by_id(db, task_id, user_id)
-    if db_task:
-        db.delete(db_task)
-        db.commit()
-    return db_task
+    """Tombstone a task in one statement, returning its id or None if not found."""
+    version = _bump_version(
+        db, user_id, total=-1, completed=_if_live(task_id, user_id, -1, Task.completed)
+    )
+    deleted_id = db.scalars(
+        update(Task)
+        .where(Task.id == task_id, Task.owner_id == user_id, Task.deleted_at.is_(None))
+        .values(deleted_at=utcnow(), version=version)
+        .returning(Task.id)
+    ).first()
+    if deleted_id is None:
+        db.rollback()
+        return None
+    db.commit()
+    _publish(user_id, version, "deleted", task_id=deleted_id)
+    return deleted_id
+
+
+def bulk_apply(db: Session, operations: List[TaskBulkOperation], user_id: int):
+    """Apply a batch of create/update/delete operations in one transaction.
+
+    Creates run as a single multi-row INSERT ... RETURNING, updates as one
+    UPDATE ... RETURNING each and deletes as a single UPDATE ... RETURNING
+    that tombstones them; they are applied in that order. Results come back
+    in request order.
+    """
+    results: List[Optional[TaskBulkResult]] = [None] * len(operations)
+    # Operation i is stamped with version first_version + i, so the change
+    # feed and delta sync see the batch item by item. Operations that miss
+    # leave gaps, which consumers tolerate.
+    creates = [
+        (i, op) for i, op in enumerate(operations) if isinstance(op, TaskBulkCreate)
+    ]
+    # Creates always land, so their counts ride along with the version bump
+    last_version = _bump_version(
+        db,
+        user_id,
+        len(operations),
+        total=len(creates),
+        completed=sum(1 for _, op in creates if op.task.completed),
+    )
+    first_version = last_version - len(operations) + 1
+    # Updates and deletes move the counters by the net change over the tasks
+    # they touch, read under the summary row lock taken above.
+    touched = {op.id for op in operations if not isinstance(op, TaskBulkCreate)}
+    before = _live_counts(db, user_id, touched)
+
+    if creates:
+        # Rows are matched back by their unique version rather than with
+        # sort_by_parameter_order, which SQLite can only honour by inserting
+        # one row per statement.
+        created = db.scalars(
+            insert(Task).returning(Task),
+            [
+                {
+                    **op.task.model_dump(),
+                    "owner_id": user_id,
+                    "version": first_version + i,
+                }
+                for i, op in creates
+            ],
+        ).all()
+        by_version = {db_task.version: db_task for db_task in created}
+        for i, op in creates:
+            results[i] = _bulk_result(i, op, by_version[first_version + i])
+
+    for i, op in enumerate(operations):
+        if isinstance(op, TaskBulkUpdate):
+            values = op.task.model_dump(exclude_unset=True)
+            values["version"] = first_version + i
+            db_task = _update_owned_task(db, op.id, user_id, values)
+            results[i] = _bulk_result(i, op, db_task)
+
+    deletes = {
+        op.id: first_version + i
+        for i, op in enumerate(operations)
+        if isinstance(op, TaskBulkDelete)
+    }
+    if deletes:
+        deleted_ids = set(
+            db.scalars(
+                update(Task)
+                .where(
+                    Task.owner_id == user_id,
+                    Task.id.in_(deletes),
+                    Task.deleted_at.is_(None),
+                )
+                .values(
+                    deleted_at=utcnow(),
+                    version=case(deletes, value=Task.id),
+                )
+                .returning(Task.id)
+            )
+        )
+        for i, op in enumerate(operations):
+            if isinstance(op, TaskBulkDelete):
+                results[i] = TaskBulkResult(
+                    index=i,
+                    op=op.op,
+                    id=op.id,
+                    status="ok" if op.id in deleted_ids else "not_found",
+                )
+
+    if not any(result.status == "ok" for result in results):
+        db.rollback()
+        return results
+    after = _live_counts(db, user_id, touched)
+    if after != before:
+        db.execute(
+            update(TaskSummary)
+            .where(TaskSummary.owner_id == user_id)
+            .values(
+                total=TaskSummary.total + after[0] - before[0],
+                completed=TaskSummary.completed + after[1] - before[1],
+            )
+        )
+    db.commit()
+    for result in results:
+        if result.status == "ok":
+            _publish(
+                user_id,
+                first_version + result.index,
+                _CHANGE_TYPES[result.op],
+                result.task,
+                task_id=result.id,
+            )
+    return results
+
+
+def _bulk_result(index: int, op: TaskBulkOperation, db_task: Optional[Task]):
+    # Serialize before commit expires the instances, which would otherwise
+    # cost one SELECT per item to reload.
+    if db_task is None:
+        return TaskBulkResult(index=index, op=op.op, id=op.id, status="not_found")
+    return TaskBulkResult(
+        index=index,
+        op=op.op,
+        id=db_task.id,
+        status="ok",
+        task=TaskResponse.model_validate(db_task, from_attributes=True),
+    )
+
+
+def import_tasks(
+    db: Session,
+    user_id: int,
+    records: Iterable[Tuple[int, Optional[dict], Optional[str]]],
+    batch_size: int = 5000,
+    max_errors: int = 100,
+    on_progress: Optional[Callable[[TaskImportResult], None]] = None,
+) -> TaskImportResult:
+    """Create tasks from parsed ``(line, data, error)`` records.
+
+    Records are validated with :class:`TaskCreate` as they are consumed and
+    written ``batch_size`` at a time with one executemany INSERT, each batch
+    in its own transaction, so memory stays bounded for any input size.
+    Invalid rows are skipped and reported (the first ``max_errors`` of them).
+    Change-feed subscribers get a single ``reset`` event at the end.
+    """
+    result = TaskImportResult(imported=0, failed=0, errors=[])
+    batch = []
+    for line, data, error in records:
+        if error is None:
+            try:
+                batch.append(TaskCreate.model_validate(data).model_dump())
+            except ValidationError as exc:
+                error = "; ".join(
+                    f"{'.'.join(map(str, detail['loc'])) or 'row'}: {detail['msg']}"
+                    for detail in exc.errors()
+                )
+        if error is not None:
+            result.failed += 1
+            if len(result.errors) < max_errors:
+                result.errors.append(TaskImportError(line=line, error=error))
+        if len(batch) >= batch_size:
+            _import_batch(db, user_id, batch, result)
+            batch = []
+            if on_progress is not None:
+                on_progress(result)
+    if batch:
+        _import_batch(db, user_id, batch, result)
+        if on_progress is not None:
+            on_progress(result)
+    if result.version is not None:
+        change_feed.publish(user_id, {"id": result.version, "type": "reset"})
+    return result
+
+
+def _import_batch(db: Session, user_id: int, batch: List[dict], result):
+    # Every row gets its own version so delta sync can page through them
+    completed = sum(1 for values in batch if values["completed"])
+    last_version = _bump_version(
+        db, user_id, len(batch), total=len(batch), completed=completed
+    )
+    first_version = last_version - len(batch) + 1
+    for i, values in enumerate(batch):
+        values["owner_id"] = user_id
+        values["version"] = first_version + i
+    db.execute(insert(Task), batch)
+    db.commit()
+    result.imported += len(batch)
+    result.version = last_version
+
+
+def get_task_changes(db: Session, user_id: int, since: int, limit: int = 500):
+    """Tasks created, updated or deleted after version ``since``, oldest first.
+
+    Returns ``(tasks, version, has_more)`` where ``version`` is what the
+    client should sync from next; deleted tasks appear as tombstones with ``deleted_at``
+    set. Raises :class:`ChangesExpired` when tombstones newer than ``since``
+    have already been reaped.
+    """
+    summary = db.execute(
+        select(TaskSummary.version, TaskSummary.purged_version).where(
+            TaskSummary.owner_id == user_id
+        )
+    ).first()
+    if summary is None:
+        return [], since, False
+    # Only report up to the version read here: anything committed later has a
+    # higher version and is picked up by the next sync.
+    current, purged_version = summary
+    if since < purged_version:
+        raise ChangesExpired("Changes since this version are no longer available")
+    rows = (
+        db.query(Task)
+        .filter(Task.owner_id == user_id, Task.version > since, Task.version <= current)
+        .order_by(Task.version, Task.id)
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].version, True
+    return rows, max(current, since), False
+
+
+def purge_tombstones(db: Session, older_than: datetime) -> int:
+    """Hard-delete tombstones from before ``older_than``; returns rows removed.
+
+    Each owner's ``purged_version`` is raised first, so delta sync from an
+    older version is told to resync instead of silently missing deletes.
+    """
+    expired = Task.deleted_at < _as_utc(older_than)
+    horizons = db.execute(
+        select(Task.owner_id, func.max(Task.version))
+        .where(expired)
+        .group_by(Task.owner_id)
+    ).all()
+    for owner_id, version in horizons:
+        db.execute(
+            update(TaskSummary)
+            .where(
+                TaskSummary.owner_id == owner_id,
+                TaskSummary.purged_version < version,
+            )
+            .values(purged_version=version)
+        )
+    removed = db.execute(delete(Task).where(expired)).rowcount
+    db.commit()
+    return removed
@@ -0,0 +1,150 @@
+"""Refresh-token rotation and session revocation.
+
+A login starts a session: an access token carrying the session id as ``sid``
+and a refresh token stored only as its SHA-256 digest. Refreshing consumes the
+refresh token and issues a new pair for the same session, so renewing never
+needs a password check. Presenting an already consumed token means it leaked,
+and revokes the whole session.
+"""
+
+import hashlib
+import secrets
+from datetime import UTC, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.revocation import revoked_sessions
+from app.core.security import create_access_token
+from app.models.refresh_token import RefreshToken
+from app.models.revoked_session import RevokedSession
+from app.models.task import utcnow
+from app.models.user import User
+
+# Re-read this far behind the newest revocation seen, to catch rows whose
+# transactions committed out of order
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class InvalidRefreshToken(LookupError):
+    """Raised for unknown, expired, consumed or revoked refresh tokens."""
+
+
+def _hash_token(raw: str) -> str:
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Naive datetimes are taken as UTC, which is how timestamps are stored
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
+
+
+def issue_tokens(db: Session, user: User, session_id: Optional[str] = None) -> dict:
+    """New access/refresh pair for ``user``, starting a session if none given."""
+    session_id = session_id or secrets.token_hex(16)
+    raw = secrets.token_urlsafe(32)
+    db.add(
+        RefreshToken(
+            user_id=user.id,
+            token_hash=_hash_token(raw),
+            session_id=session_id,
+            expires_at=utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    db.commit()
+    expires_in = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.username, "sid": session_id}, expires_delta=expires_in
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": raw,
+        "token_type": "bearer",
+        "expires_in": int(expires_in.total_seconds()),
+    }
+
+
+def refresh_tokens(db: Session, raw: str) -> dict:
+    """Consume a refresh token and issue the next pair of its session."""
+    now = utcnow()
+    token_hash = _hash_token(raw)
+    # Consuming is a single conditional UPDATE, so two concurrent refreshes
+    # with the same token cannot both succeed
+    consumed = db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(revoked_at=now)
+        .returning(RefreshToken.user_id, RefreshToken.session_id)
+    ).first()
+    if consumed is None:
+        reused = db.execute(
+            select(RefreshToken.session_id).where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.revoked_at.is_not(None),
+            )
+        ).scalar()
+        if reused is not None:
+            revoke_session(db, reused)
+        raise InvalidRefreshToken("Invalid or expired refresh token")
+    user_id, session_id = consumed
+    user = db.get(User, user_id)
+    if user is None or not user.is_active or session_id in revoked_sessions:
+        db.commit()
+        raise InvalidRefreshToken("Invalid or expired refresh token")
+    return issue_tokens(db, user, session_id=session_id)
+
+
+def revoke_session(db: Session, session_id: str) -> None:
+    """End a session: its refresh tokens stop working, its access tokens too."""
+    now = utcnow()
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.session_id == session_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+    # Access tokens are never renewed past this, so the entry can go then
+    expires_at = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    db.merge(
+        RevokedSession(session_id=session_id, revoked_at=now, expires_at=expires_at)
+    )
+    db.commit()
+    revoked_sessions.add(session_id, expires_at.timestamp())
+
+
+def sync_revocations(db: Session) -> int:
+    """Load sessions revoked by other workers; returns how many were read."""
+    now = utcnow()
+    query = select(
+        RevokedSession.session_id, RevokedSession.revoked_at, RevokedSession.expires_at
+    ).where(RevokedSession.expires_at > now)
+    if revoked_sessions.watermark is not None:
+        since = revoked_sessions.watermark - SYNC_OVERLAP
+        query = query.where(RevokedSession.revoked_at > since)
+    rows = db.execute(query).all()
+    for session_id, _, expires_at in rows:
+        revoked_sessions.add(session_id, _as_utc(expires_at).timestamp())
+    revoked_sessions.synced(max((_as_utc(row[1]) for row in rows), default=None))
+    return len(rows)
+
+
+def purge_expired_tokens(db: Session) -> int:
+    """Delete expired refresh tokens and revocations; returns tokens removed.
+
+    Consumed tokens are kept until they expire so that replaying one is still
+    recognised as reuse.
+    """
+    now = utcnow()
+    removed = db.execute(
+        delete(RefreshToken).where(RefreshToken.expires_at < now)
+    ).rowcount
+    db.execute(delete(RevokedSession).where(RevokedSession.expires_at < now))
+    db.commit()
+    return removed
@@ -1,8 +1,23 @@
-from sqlalchemy.orm import Session
+from typing import Optional
 
-from app.core.security import get_password_hash, verify_password
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, inspect, or_
+from sqlalchemy.orm import Session, object_session
+
+from app.core.cache import build_cache
+from app.core.config import settings
+from app.core.security import aget_password_hash, averify_and_update_password
 from app.models.user import User
-from app.schemas.user import UserCreate
+from app.schemas.user import UserCreate, UserResponse
+
+
+# Identity of authenticated users keyed by username (the token subject)
+user_cache = build_cache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    redis_url=settings.USER_CACHE_REDIS_URL,
+    prefix="user:",
+)
 
 
 def get_user_by_username(db: Session, username: str):
@@ -13,8 +28,16 @@ def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+def get_user_by_username_or_email(db: Session, username: str, email: str):
+    """Username and email of an account already holding either value."""
+    return (
+        db.query(User.username, User.email)
+        .filter(or_(User.username == username, User.email == email))
+        .first()
+    )
+
+
+def _add_user(db: Session, user: UserCreate, hashed_password: str) -> User:
     db_user = User(
         email=user.email,
         username=user.username,
@@ -27,10 +50,57 @@ def create_user(db: Session, user: UserCreate):
     return db_user
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user_by_username(db, username)
+async def create_user(db: Session, user: UserCreate):
+    """Hash on the bcrypt pool, then insert from the threadpool.
+
+    Only the queries borrow a threadpool thread, so requests queued for bcrypt
+    never hold threads the sync endpoints need. Likewise for login below.
+    """
+    hashed_password = await aget_password_hash(user.password)
+    return await run_in_threadpool(_add_user, db, user, hashed_password)
+
+
+async def authenticate_user(db: Session, username: str, password: str):
+    user = await run_in_threadpool(get_user_by_username, db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await averify_and_update_password(
+        password, user.hashed_password
+    )
+    if not verified:
         return False
+    if new_hash:
+        # Cost factor changed since this hash was made; upgrade it transparently
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
     return user
+
+
+def get_cached_user(username: str) -> Optional[UserResponse]:
+    cached = user_cache.get(username)
+    return None if cached is None else UserResponse.model_validate(cached)
+
+
+def cache_user(user: User) -> UserResponse:
+    identity = UserResponse.model_validate(user, from_attributes=True)
+    user_cache.set(user.username, identity.model_dump(mode="json"))
+    return identity
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    # Drop the entry at flush and again at commit, so a request that read the
+    # old row concurrently can't leave it cached past the change.
+    usernames = {target.username, *inspect(target).attrs.username.history.deleted}
+    for username in usernames:
+        user_cache.delete(username)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_usernames", set()).update(usernames)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for username in session.info.pop("stale_usernames", ()):
+        user_cache.delete(username)
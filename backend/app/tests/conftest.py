@@ -1,9 +1,15 @@
 import pytest
+import pytest_asyncio
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from httpx import AsyncClient
 import sys
 import os
+from contextlib import contextmanager
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 
@@ -12,13 +18,34 @@ sys.path.append(
     os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 )
 
-from app.core.database import Base, get_db
+from app.api.endpoints import async_tasks, async_users
+from app.core.concurrency import concurrency_limiter
+from app.core.config import settings
+from app.core.database import Base, get_async_db, get_db
+from app.core.instrumentation import QueryLog
+from app.core.ratelimit import rate_limiter
+from app.core.revocation import revoked_sessions
+from app.core.security import token_cache
 from app.main import app
+from app.services.user_service import user_cache
 
 # Test database
 TEST_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 
+
+# pysqlite defers BEGIN on its own, which breaks SAVEPOINTs; take over
+# transaction control so nested savepoints behave like on other databases
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_begin(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _emit_begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -35,7 +62,11 @@ def db_session(test_db):
     """Create a fresh database session for each test"""
     connection = engine.connect()
     transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    # Service-level commits and rollbacks act on a SAVEPOINT, leaving the outer
+    # transaction for the fixture to roll back
+    session = TestingSessionLocal(
+        bind=connection, join_transaction_mode="create_savepoint"
+    )
 
     yield session
 
@@ -55,5 +86,74 @@ def client(db_session):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    user_cache.clear()
+    token_cache.clear()
+    revoked_sessions.clear()
+    rate_limiter.clear()
+    concurrency_limiter.reset()
     yield TestClient(app)
     app.dependency_overrides.clear()
+    user_cache.clear()
+    token_cache.clear()
+    revoked_sessions.clear()
+    rate_limiter.clear()
+    concurrency_limiter.reset()
+
+
+@pytest.fixture
+def query_budget():
+    """Fail the test if a block issues too many queries or an N+1 pattern.
+
+    Usage::
+
+        with query_budget(3):
+            client.get("/api/v1/tasks/", headers=headers)
+
+    Transaction control (BEGIN/SAVEPOINT/...) is not counted.
+    """
+
+    @contextmanager
+    def check(max_queries: int, repeat_limit: int = settings.QUERY_REPEAT_LIMIT):
+        log = QueryLog()
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            log.record(statement)
+
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            yield log
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+        problems = log.problems(max_queries, repeat_limit)
+        assert not problems, "Query budget exceeded:\n" + "\n".join(problems)
+
+    return check
+
+
+@pytest_asyncio.fixture
+async def async_client():
+    """Create an async test client serving the AsyncSession endpoints"""
+    async_engine = create_async_engine("sqlite+aiosqlite:///./test_async.db")
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    AsyncTestingSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    async_app = FastAPI()
+    async_app.include_router(async_users.router, prefix="/api/v1/users")
+    async_app.include_router(async_tasks.router, prefix="/api/v1/tasks")
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+
+    user_cache.clear()
+    async with AsyncClient(app=async_app, base_url="http://test") as ac:
+        yield ac
+    user_cache.clear()
+
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+    await async_engine.dispose()
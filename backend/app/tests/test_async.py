@@ -0,0 +1,74 @@
+import pytest
+from httpx import AsyncClient
+
+from app.core.database import get_async_database_url
+
+
+def test_get_async_database_url():
+    """Test that sync driver URLs map to their asyncio drivers"""
+    assert (
+        get_async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    )
+    assert (
+        get_async_database_url("postgresql://user:pw@db:5432/todo")
+        == "postgresql+asyncpg://user:pw@db:5432/todo"
+    )
+    assert (
+        get_async_database_url("postgresql+psycopg2://user:pw@db/todo")
+        == "postgresql+asyncpg://user:pw@db/todo"
+    )
+
+
+@pytest.mark.asyncio
+async def test_async_task_lifecycle(async_client: AsyncClient):
+    """Test register, login and task CRUD through the async request path"""
+    user_data = {
+        "username": "asyncuser",
+        "email": "async@example.com",
+        "password": "asyncpass123",
+    }
+    response = await async_client.post("/api/v1/users/register", json=user_data)
+    assert response.status_code == 200, f"Register failed: {response.text}"
+
+    login_data = {"username": "asyncuser", "password": "asyncpass123"}
+    login_response = await async_client.post("/api/v1/users/login", params=login_data)
+    assert login_response.status_code == 200, f"Login failed: {login_response.text}"
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    create_response = await async_client.post(
+        "/api/v1/tasks/", json={"title": "Async Task"}, headers=headers
+    )
+    assert (
+        create_response.status_code == 200
+    ), f"Create task failed: {create_response.text}"
+    task_id = create_response.json()["id"]
+
+    response = await async_client.put(
+        f"/api/v1/tasks/{task_id}", json={"completed": True}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["completed"]
+
+    response = await async_client.get("/api/v1/tasks/", headers=headers)
+    assert response.status_code == 200
+    assert [task["title"] for task in response.json()] == ["Async Task"]
+
+    response = await async_client.delete(f"/api/v1/tasks/{task_id}", headers=headers)
+    assert response.status_code == 200
+
+    response = await async_client.get("/api/v1/tasks/", headers=headers)
+    assert response.json() == []
+
+
+def test_async_mode_keeps_sync_only_routes():
+    """Test that routes without an async handler stay mounted in async mode"""
+    from app.api.endpoints import async_tasks, tasks
+    from app.api.routes import _routes_not_in
+
+    remaining = _routes_not_in(tasks.router, async_tasks.router)
+    served = {
+        (route.path, method) for route in remaining.routes for method in route.methods
+    }
+    assert ("/bulk", "POST") in served
+    assert ("/", "GET") not in served
+    assert ("/{task_id}", "PUT") not in served
@@ -25,3 +25,106 @@ def test_docs_available(client):
     """Test that API docs are available."""
     response = client.get("/docs")
     assert response.status_code == 200
+
+
+def test_pool_stats_endpoint(client, monkeypatch):
+    """Test that connection pool stats are published behind the internal token."""
+    from app.core.config import settings
+
+    response = client.get("/internal/pool")
+    assert response.status_code == 404
+
+    monkeypatch.setattr(settings, "INTERNAL_TOKEN", "ops-secret")
+    response = client.get("/internal/pool")
+    assert response.status_code == 401
+    response = client.get(
+        "/internal/pool", headers={"Authorization": "Bearer wrong-secret"}
+    )
+    assert response.status_code == 401
+
+    response = client.get(
+        "/internal/pool", headers={"Authorization": "Bearer ops-secret"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["pool"] == "InstrumentedQueuePool"
+    assert "checked_out" in data
+    assert "overflow" in data
+    assert "+Inf" in data["wait_seconds"]["buckets"]
+
+
+def test_memory_sqlite_shares_one_connection():
+    """Test that in-memory SQLite uses a single shared connection."""
+    from sqlalchemy.pool import StaticPool
+
+    from app.core.database import get_engine_options
+
+    assert get_engine_options("sqlite://")["poolclass"] is StaticPool
+    assert get_engine_options("sqlite:///:memory:")["poolclass"] is StaticPool
+    assert "pool_size" in get_engine_options("sqlite:///./file.db")
+
+
+def test_request_metrics_and_server_timing(client, monkeypatch):
+    """Test per-route metrics and the Server-Timing header."""
+    from app.core.config import settings
+
+    user_data = {
+        "username": "metricsuser",
+        "email": "metrics@example.com",
+        "password": "metricspass123",
+    }
+    response = client.post("/api/v1/users/register", json=user_data)
+    assert 'desc="' in response.headers["server-timing"]
+    assert "queries" in response.headers["server-timing"]
+
+    client.get("/api/v1/tasks/12345")
+    response = client.get("/no/such/path")
+    assert response.status_code == 404
+    assert response.headers["server-timing"].startswith('db;dur=0.00;desc="0 queries"')
+
+    response = client.get("/metrics")
+    assert response.status_code == 404
+    monkeypatch.setattr(settings, "INTERNAL_TOKEN", "scrape-secret")
+    response = client.get("/metrics")
+    assert response.status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert (
+        'http_requests_total{method="POST",route="/api/v1/users/register",'
+        'status="200"}' in body
+    )
+    assert (
+        'http_requests_total{method="GET",route="/api/v1/tasks/{task_id}",'
+        'status="403"}' in body
+    )
+    assert 'route="<unmatched>",status="404"' in body
+    assert (
+        'http_request_db_queries_total{method="POST",route="/api/v1/users/register"}'
+        in body
+    )
+    assert "http_requests_in_flight 1" in body
+    assert "db_query_duration_seconds_count" in body
+    assert 'db_pool_connections{state="checked_out"}' in body
+
+
+def test_query_detector_logs_requests_over_budget(client, monkeypatch, caplog):
+    """Test that debug mode logs requests exceeding the query budget."""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "QUERY_DETECTOR", True)
+    monkeypatch.setattr(settings, "QUERY_BUDGET", 0)
+    user_data = {
+        "username": "detectuser",
+        "email": "detect@example.com",
+        "password": "detectpass123",
+    }
+    with caplog.at_level("WARNING", logger="app.core.instrumentation"):
+        client.post("/api/v1/users/register", json=user_data)
+    assert any(
+        "POST /api/v1/users/register" in message and "over the budget of 0" in message
+        for message in caplog.messages
+    )
@@ -1,3 +1,4 @@
+import pytest
 from fastapi.testclient import TestClient
 
 
@@ -55,3 +56,128 @@ def test_rate_limiting_basic(client: TestClient):
 
     # Should not crash and should return proper status codes
     assert response.status_code in [401, 429]  # Unauthorized or Too Many Requests
+
+
+def test_login_attempts_are_rate_limited(client: TestClient):
+    """Test that a client hammering login gets 429 without touching others"""
+    login_data = {"username": "nonexistent", "password": "wrongpassword"}
+
+    statuses = [
+        client.post("/api/v1/users/login", params=login_data).status_code
+        for _ in range(12)
+    ]
+    assert statuses[:10] == [401] * 10
+    assert statuses[10:] == [429, 429]
+    response = client.post("/api/v1/users/login", params=login_data)
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Other routes draw on their own budget
+    assert client.get("/health").status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_token_buckets_refill_per_client():
+    """Test bucket accounting per client, rule and elapsed time"""
+    import asyncio
+
+    from app.core.ratelimit import MemoryBucketStore, RateLimiter, RateLimitExceeded
+
+    store = MemoryBucketStore()
+    limiter = RateLimiter(
+        store, limits={"POST /items/{item_id}": "2/second"}, default=None
+    )
+    await limiter.check("POST", "/items/1", "user:alice")
+    await limiter.check("POST", "/items/2", "user:alice")
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        await limiter.check("POST", "/items/3", "user:alice")
+    assert 0 < exc_info.value.retry_after <= 0.5
+    await limiter.check("POST", "/items/1", "user:bob")
+    # No default budget: unmatched routes are unlimited
+    for _ in range(10):
+        await limiter.check("GET", "/items/1", "user:alice")
+
+    assert await store.take("bucket", rate=1000, burst=1) == 0
+    assert await store.take("bucket", rate=1000, burst=1) > 0
+    await asyncio.sleep(0.005)
+    assert await store.take("bucket", rate=1000, burst=1) == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limiter_queues_then_sheds():
+    """Test admission, bounded queueing, hand-off and latency backoff"""
+    import asyncio
+
+    from app.core.concurrency import ConcurrencyLimiter, Overloaded
+
+    limiter = ConcurrencyLimiter(
+        max_limit=1, min_limit=1, target_latency=0.1, queue_size=1, queue_timeout=0.05
+    )
+    await limiter.acquire()
+    # The queue holds one waiter; the next request is shed immediately
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded, match="queue full"):
+        await limiter.acquire()
+    # Releasing hands the slot straight to the waiter
+    limiter.release(latency=0.01)
+    await waiting
+    assert limiter.in_flight == 1
+    # Nobody releases in time, so the next waiter gives up
+    with pytest.raises(Overloaded, match="queue timeout"):
+        await limiter.acquire()
+    limiter.release()
+    assert limiter.in_flight == 0 and limiter.queued == 0
+
+    limiter = ConcurrencyLimiter(
+        max_limit=10, min_limit=2, target_latency=0.1, queue_size=0, queue_timeout=1
+    )
+    await limiter.acquire()
+    limiter.release(latency=1.0)
+    assert limiter.limit == 9
+    # Fast responses win capacity back gradually
+    for _ in range(9):
+        await limiter.acquire()
+        limiter.release(latency=0.01)
+    assert 9 < limiter.limit <= 10
+
+
+def test_verified_tokens_are_cached_until_expiry(monkeypatch):
+    """Test that a token is decoded once and then served from the cache"""
+    from datetime import timedelta
+
+    from app.core import security
+
+    security.token_cache.clear()
+    decodes = []
+    decode = security.jwt_backend.decode
+    monkeypatch.setattr(
+        security.jwt_backend,
+        "decode",
+        lambda token: decodes.append(token) or decode(token),
+    )
+
+    token = security.create_access_token({"sub": "cacheduser"})
+    assert security.verify_token(token) == "cacheduser"
+    assert security.verify_token(token) == "cacheduser"
+    assert len(decodes) == 1
+
+    # Tampered and expired tokens are rejected and never cached
+    assert security.verify_token(token[:-2] + "xx") is None
+    expired = security.create_access_token(
+        {"sub": "cacheduser"}, expires_delta=timedelta(seconds=-1)
+    )
+    assert security.verify_token(expired) is None
+    assert len(security.token_cache) == 1
+
+
+def test_pyjwt_backend_interoperates_with_jose():
+    """Test that the PyJWT backend accepts and issues compatible tokens"""
+    pytest.importorskip("jwt")
+    from app.core.security import JoseBackend, PyJWTBackend, create_access_token
+
+    pyjwt, jose = PyJWTBackend(), JoseBackend()
+    token = create_access_token({"sub": "interop"})
+    assert pyjwt.decode(token)["sub"] == "interop"
+    assert jose.decode(pyjwt.encode({"sub": "back"}))["sub"] == "back"
+    with pytest.raises(pyjwt.errors):
+        pyjwt.decode(token + "x")
@@ -1,3 +1,6 @@
+import asyncio
+
+import pytest
 from fastapi.testclient import TestClient
 
 
@@ -220,3 +223,1109 @@ def test_task_ownership_isolation(client: TestClient):
         response.status_code == 200
     ), f"Expected 200, got {response.status_code}. Response: {response.text}"
     assert len(response.json()) == 0
+
+
+def test_get_tasks_cursor_pagination(client: TestClient):
+    """Test walking the task list with keyset cursors"""
+    user_data = {
+        "username": "cursoruser",
+        "email": "cursor@example.com",
+        "password": "cursorpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "cursoruser", "password": "cursorpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    assert login_response.status_code == 200, f"Login failed: {login_response.text}"
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    for i in range(5):
+        client.post("/api/v1/tasks/", json={"title": f"Task {i}"}, headers=headers)
+
+    titles = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/api/v1/tasks/", params=params, headers=headers)
+        assert (
+            response.status_code == 200
+        ), f"Expected 200, got {response.status_code}. Response: {response.text}"
+        titles.extend(task["title"] for task in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            break
+        params = {"limit": 2, "cursor": next_cursor}
+
+    assert titles == [f"Task {i}" for i in range(5)]
+
+
+def test_get_tasks_invalid_cursor(client: TestClient):
+    """Test that a malformed cursor is rejected"""
+    user_data = {
+        "username": "badcursoruser",
+        "email": "badcursor@example.com",
+        "password": "badcursorpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "badcursoruser", "password": "badcursorpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    response = client.get(
+        "/api/v1/tasks/", params={"cursor": "not-a-cursor"}, headers=headers
+    )
+    assert response.status_code == 400
+
+
+def test_bulk_task_operations(client: TestClient):
+    """Test applying creates, updates and deletes in one request"""
+    user_data = {
+        "username": "bulkuser",
+        "email": "bulk@example.com",
+        "password": "bulkpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "bulkuser", "password": "bulkpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    assert login_response.status_code == 200, f"Login failed: {login_response.text}"
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    existing = client.post(
+        "/api/v1/tasks/", json={"title": "Existing"}, headers=headers
+    ).json()
+    doomed = client.post(
+        "/api/v1/tasks/", json={"title": "Doomed"}, headers=headers
+    ).json()
+
+    operations = [
+        {"op": "create", "task": {"title": "Bulk 1"}},
+        {"op": "update", "id": existing["id"], "task": {"completed": True}},
+        {"op": "delete", "id": doomed["id"]},
+        {"op": "create", "task": {"title": "Bulk 2", "completed": True}},
+        {"op": "delete", "id": 999999},
+        {"op": "update", "id": 999999, "task": {"title": "Missing"}},
+    ]
+    response = client.post(
+        "/api/v1/tasks/bulk", json={"operations": operations}, headers=headers
+    )
+    assert (
+        response.status_code == 200
+    ), f"Expected 200, got {response.status_code}. Response: {response.text}"
+    results = response.json()["results"]
+    assert [r["index"] for r in results] == list(range(len(operations)))
+    assert [r["status"] for r in results] == [
+        "ok",
+        "ok",
+        "ok",
+        "ok",
+        "not_found",
+        "not_found",
+    ]
+    assert results[0]["task"]["title"] == "Bulk 1"
+    assert results[1]["task"]["completed"]
+    assert results[3]["task"]["completed"]
+
+    titles = [
+        task["title"] for task in client.get("/api/v1/tasks/", headers=headers).json()
+    ]
+    assert titles == ["Existing", "Bulk 1", "Bulk 2"]
+
+
+def test_update_and_delete_missing_task(client: TestClient):
+    """Test that updating or deleting an unknown task returns 404"""
+    user_data = {
+        "username": "missinguser",
+        "email": "missing@example.com",
+        "password": "missingpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "missinguser", "password": "missingpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    response = client.put(
+        "/api/v1/tasks/999999",
+        json={"title": "Nope", "description": "Nope", "completed": True},
+        headers=headers,
+    )
+    assert response.status_code == 404
+
+    response = client.delete("/api/v1/tasks/999999", headers=headers)
+    assert response.status_code == 404
+
+    # The failed writes must not disturb the rest of the session
+    response = client.post(
+        "/api/v1/tasks/", json={"title": "Still works"}, headers=headers
+    )
+    assert response.status_code == 200
+
+
+def test_task_list_conditional_get(client: TestClient):
+    """Test that unchanged task lists answer If-None-Match with 304"""
+    user_data = {
+        "username": "etaguser",
+        "email": "etag@example.com",
+        "password": "etagpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "etaguser", "password": "etagpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    task_id = client.post(
+        "/api/v1/tasks/", json={"title": "Polled"}, headers=headers
+    ).json()["id"]
+
+    response = client.get("/api/v1/tasks/", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/v1/tasks/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    # A different page is a different representation
+    response = client.get(
+        "/api/v1/tasks/",
+        params={"limit": 1},
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert response.status_code == 200
+
+    client.put(f"/api/v1/tasks/{task_id}", json={"completed": True}, headers=headers)
+    response = client.get("/api/v1/tasks/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()[0]["completed"]
+
+
+def test_get_single_task_conditional_get(client: TestClient):
+    """Test reading one task and revalidating it with its ETag"""
+    user_data = {
+        "username": "itemetaguser",
+        "email": "itemetag@example.com",
+        "password": "itemetagpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "itemetaguser", "password": "itemetagpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    task_id = client.post(
+        "/api/v1/tasks/", json={"title": "Single"}, headers=headers
+    ).json()["id"]
+
+    response = client.get(f"/api/v1/tasks/{task_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["title"] == "Single"
+
+    etag = response.headers["ETag"]
+    response = client.get(
+        f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    response = client.get("/api/v1/tasks/999999", headers=headers)
+    assert response.status_code == 404
+    # Matching anything, or this user's ETag, still can't hide a missing task
+    for match in ("*", etag):
+        response = client.get(
+            "/api/v1/tasks/999999", headers={**headers, "If-None-Match": match}
+        )
+        assert response.status_code == 404
+
+
+def test_task_writes_publish_change_events(client: TestClient):
+    """Test that task writes land on the user's change feed in order"""
+    from app.core.events import change_feed
+
+    user_data = {
+        "username": "feeduser",
+        "email": "feed@example.com",
+        "password": "feedpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "feeduser", "password": "feedpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    user_id = client.get("/api/v1/users/me", headers=headers).json()["id"]
+    change_feed.clear()
+
+    task_id = client.post(
+        "/api/v1/tasks/", json={"title": "Streamed"}, headers=headers
+    ).json()["id"]
+    client.put(f"/api/v1/tasks/{task_id}", json={"completed": True}, headers=headers)
+    client.post(
+        "/api/v1/tasks/bulk",
+        json={"operations": [{"op": "create", "task": {"title": "Bulk"}}]},
+        headers=headers,
+    )
+    client.delete(f"/api/v1/tasks/{task_id}", headers=headers)
+
+    events = change_feed.replay(user_id, 0)
+    assert [event["id"] for event in events] == [1, 2, 3, 4]
+    assert [event["type"] for event in events] == [
+        "created",
+        "updated",
+        "created",
+        "deleted",
+    ]
+    assert events[1]["task"]["completed"]
+    assert events[3]["task_id"] == task_id
+
+    # Resuming from a version we no longer have is reported as a gap
+    assert change_feed.replay(user_id, 4) == []
+    change_feed.clear()
+    assert change_feed.replay(user_id, 2) == []
+
+
+@pytest.mark.asyncio
+async def test_change_stream_replays_and_follows():
+    """Test the SSE generator resumes from Last-Event-ID then streams live"""
+    from app.api.endpoints.tasks import _change_stream
+    from app.core.events import change_feed
+
+    class FakeRequest:
+        def __init__(self, connected_checks):
+            self.connected_checks = connected_checks
+
+        async def is_disconnected(self):
+            self.connected_checks -= 1
+            return self.connected_checks < 0
+
+    change_feed.clear()
+    change_feed.publish(42, {"id": 1, "type": "created", "task": {"id": 7}})
+    change_feed.publish(42, {"id": 2, "type": "deleted", "task_id": 7})
+    queue = change_feed.subscribe(42)
+    change_feed.publish(42, {"id": 3, "type": "deleted", "task_id": 8})
+    await asyncio.sleep(0)
+
+    chunks = [chunk async for chunk in _change_stream(FakeRequest(1), 42, queue, 1, 2)]
+    assert chunks[0].startswith("retry:")
+    assert chunks[1].startswith("id: 2\nevent: deleted\n")
+    assert chunks[2].startswith("id: 3\nevent: deleted\n")
+    assert len(chunks) == 3
+
+    # A client too far behind is told to refetch
+    queue = change_feed.subscribe(42)
+    change_feed.clear()
+    chunks = [chunk async for chunk in _change_stream(FakeRequest(0), 42, queue, 0, 3)]
+    assert chunks[1].startswith("id: 3\nevent: reset\n")
+    change_feed.clear()
+
+
+def test_change_stream_accepts_stream_token(client: TestClient, monkeypatch):
+    """Test EventSource-style auth on the change feed via a URL token"""
+    from app.api.endpoints import tasks
+
+    async def one_event(request, user_id, queue, last_event_id, version):
+        yield f"id: {version}\nevent: hello\ndata: {user_id}\n\n"
+
+    monkeypatch.setattr(tasks, "_change_stream", one_event)
+
+    user_data = {
+        "username": "sseuser",
+        "email": "sse@example.com",
+        "password": "ssepass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "sseuser", "password": "ssepass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    access_token = login_response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    response = client.post("/api/v1/tasks/stream/token", headers=headers)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    stream_token = response.json()["token"]
+    assert response.json()["expires_in"] > 0
+
+    response = client.get("/api/v1/tasks/stream", params={"token": stream_token})
+    assert (
+        response.status_code == 200
+    ), f"Expected 200, got {response.status_code}. Response: {response.text}"
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "event: hello" in response.text
+    assert client.get("/api/v1/tasks/stream", headers=headers).status_code == 200
+
+    # Stream tokens only open the stream, and full tokens stay out of URLs
+    stream_headers = {"Authorization": f"Bearer {stream_token}"}
+    assert client.get("/api/v1/tasks/", headers=stream_headers).status_code == 401
+    response = client.get("/api/v1/tasks/stream", params={"token": access_token})
+    assert response.status_code == 401
+    assert client.get("/api/v1/tasks/stream").status_code == 401
+
+    # Logging out ends the stream tokens of the session too
+    client.post("/api/v1/users/logout", headers=headers)
+    response = client.get("/api/v1/tasks/stream", params={"token": stream_token})
+    assert response.status_code == 401
+
+
+def test_search_tasks_ranked_and_paginated(client: TestClient):
+    """Test full-text search ranks matches and pages with cursors"""
+    user_data = {
+        "username": "searchuser",
+        "email": "search@example.com",
+        "password": "searchpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "searchuser", "password": "searchpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    tasks = [
+        {"title": "Buy milk", "description": "milk milk milk for the weekend"},
+        {"title": "Walk the dog"},
+        {"title": "Call plumber", "description": "ask about the milk pipe"},
+        {"title": "Milk", "description": "oat milk"},
+    ]
+    for task in tasks:
+        client.post("/api/v1/tasks/", json=task, headers=headers)
+    renamed = client.post(
+        "/api/v1/tasks/", json={"title": "Old milk note"}, headers=headers
+    ).json()
+    client.put(
+        f"/api/v1/tasks/{renamed['id']}", json={"title": "Renamed"}, headers=headers
+    )
+
+    response = client.get("/api/v1/tasks/search", params={"q": "milk"}, headers=headers)
+    assert (
+        response.status_code == 200
+    ), f"Expected 200, got {response.status_code}. Response: {response.text}"
+    titles = [task["title"] for task in response.json()]
+    assert sorted(titles) == ["Buy milk", "Call plumber", "Milk"]
+    assert titles[-1] == "Call plumber"
+
+    pages = []
+    params = {"q": "milk", "limit": 2}
+    while True:
+        response = client.get("/api/v1/tasks/search", params=params, headers=headers)
+        pages.extend(task["title"] for task in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert pages == titles
+
+    # FTS syntax in user input is treated as plain terms
+    response = client.get(
+        "/api/v1/tasks/search", params={"q": 'milk" OR dog'}, headers=headers
+    )
+    assert response.status_code == 200
+
+
+def test_get_tasks_filtered_and_sorted(client: TestClient):
+    """Test server-side filters and descending cursor pagination"""
+    user_data = {
+        "username": "filteruser",
+        "email": "filter@example.com",
+        "password": "filterpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "filteruser", "password": "filterpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    created = []
+    for i in range(5):
+        task = {"title": f"Task {i}", "completed": i % 2 == 0}
+        created.append(client.post("/api/v1/tasks/", json=task, headers=headers).json())
+
+    response = client.get(
+        "/api/v1/tasks/", params={"completed": "false"}, headers=headers
+    )
+    assert [task["title"] for task in response.json()] == ["Task 1", "Task 3"]
+
+    response = client.get(
+        "/api/v1/tasks/",
+        params={"completed": "true", "created_after": created[0]["created_at"]},
+        headers=headers,
+    )
+    assert [task["title"] for task in response.json()] == ["Task 2", "Task 4"]
+
+    titles = []
+    params = {"order_by": "-created_at", "limit": 2}
+    while True:
+        response = client.get("/api/v1/tasks/", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        titles.extend(task["title"] for task in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert titles == [f"Task {i}" for i in reversed(range(5))]
+
+    # A cursor only continues the ordering it was issued for
+    response = client.get(
+        "/api/v1/tasks/", params={"cursor": params["cursor"]}, headers=headers
+    )
+    assert response.status_code == 400
+
+    client.put(
+        f"/api/v1/tasks/{created[1]['id']}", json={"title": "Edited"}, headers=headers
+    )
+    edited = client.get(f"/api/v1/tasks/{created[1]['id']}", headers=headers).json()
+    response = client.get(
+        "/api/v1/tasks/",
+        params={"updated_since": edited["updated_at"], "order_by": "-updated_at"},
+        headers=headers,
+    )
+    assert [task["title"] for task in response.json()] == ["Edited"]
+
+
+def test_task_changes_delta_sync(client: TestClient, db_session):
+    """Test delta sync with tombstones and expiry after reaping"""
+    from datetime import datetime, timedelta, timezone
+
+    from app.services.task_service import purge_tombstones
+
+    user_data = {
+        "username": "syncuser",
+        "email": "sync@example.com",
+        "password": "syncpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "syncuser", "password": "syncpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    response = client.get("/api/v1/tasks/changes", headers=headers)
+    assert response.json() == {"version": 0, "has_more": False, "changes": []}
+
+    ids = [
+        client.post(
+            "/api/v1/tasks/", json={"title": f"Task {i}"}, headers=headers
+        ).json()["id"]
+        for i in range(3)
+    ]
+    response = client.get("/api/v1/tasks/changes", params={"limit": 2}, headers=headers)
+    body = response.json()
+    assert [change["id"] for change in body["changes"]] == ids[:2]
+    assert body["has_more"] and body["version"] == 2
+    since = body["version"]
+
+    client.delete(f"/api/v1/tasks/{ids[0]}", headers=headers)
+    response = client.get(
+        "/api/v1/tasks/changes", params={"since": since}, headers=headers
+    )
+    body = response.json()
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert [change["id"] for change in body["changes"]] == [ids[2], ids[0]]
+    assert body["changes"][1]["deleted_at"] is not None
+    assert not body["has_more"] and body["version"] == 4
+
+    # Deleted tasks no longer show up anywhere else
+    listed = client.get("/api/v1/tasks/", headers=headers).json()
+    assert [task["id"] for task in listed] == ids[1:]
+    response = client.get(f"/api/v1/tasks/{ids[0]}", headers=headers)
+    assert response.status_code == 404
+
+    removed = purge_tombstones(
+        db_session, older_than=datetime.now(timezone.utc) + timedelta(seconds=1)
+    )
+    assert removed == 1
+    response = client.get(
+        "/api/v1/tasks/changes", params={"since": since}, headers=headers
+    )
+    assert response.status_code == 410, f"Expected 410, got {response.status_code}"
+    response = client.get("/api/v1/tasks/changes", params={"since": 4}, headers=headers)
+    assert response.json()["changes"] == []
+
+
+def test_task_stats_follow_writes(client: TestClient, db_session):
+    """Test that task counters track every kind of write and can be rebuilt"""
+    from sqlalchemy import update
+
+    from app.models.task import Task
+    from app.services.task_service import check_task_stats, rebuild_task_stats
+
+    user_data = {
+        "username": "statsuser",
+        "email": "stats@example.com",
+        "password": "statspass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "statsuser", "password": "statspass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    def stats():
+        response = client.get("/api/v1/tasks/stats", headers=headers)
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        body = response.json()
+        return body["total"], body["completed"], body["pending"]
+
+    assert stats() == (0, 0, 0)
+    first = client.post(
+        "/api/v1/tasks/", json={"title": "Done", "completed": True}, headers=headers
+    ).json()["id"]
+    second = client.post(
+        "/api/v1/tasks/", json={"title": "Open"}, headers=headers
+    ).json()["id"]
+    assert stats() == (2, 1, 1)
+
+    client.put(f"/api/v1/tasks/{second}", json={"completed": True}, headers=headers)
+    client.put(f"/api/v1/tasks/{second}", json={"completed": True}, headers=headers)
+    assert stats() == (2, 2, 0)
+    # Clearing completed would take the task out of both counts
+    response = client.put(
+        f"/api/v1/tasks/{second}", json={"completed": None}, headers=headers
+    )
+    assert response.status_code == 422, f"Expected 422, got {response.status_code}"
+    assert stats() == (2, 2, 0)
+    client.put("/api/v1/tasks/9999", json={"completed": False}, headers=headers)
+    client.delete(f"/api/v1/tasks/{first}", headers=headers)
+    client.delete(f"/api/v1/tasks/{first}", headers=headers)
+    assert stats() == (1, 1, 0)
+
+    operations = [
+        {"op": "create", "task": {"title": "Bulk", "completed": True}},
+        {"op": "update", "id": second, "task": {"completed": False}},
+        {"op": "delete", "id": second},
+        {"op": "delete", "id": first},
+    ]
+    client.post("/api/v1/tasks/bulk", json={"operations": operations}, headers=headers)
+    assert stats() == (1, 1, 0)
+    assert check_task_stats(db_session) == []
+
+    # Drift introduced behind the service's back is found and repaired
+    db_session.execute(update(Task).values(completed=False))
+    assert len(check_task_stats(db_session)) == 1
+    assert rebuild_task_stats(db_session) == 1
+    assert stats() == (1, 0, 1)
+    assert check_task_stats(db_session) == []
+
+
+def test_list_fast_path_matches_model_serialization(client: TestClient):
+    """Test that listing rows serialize exactly like validated TaskResponses"""
+    user_data = {
+        "username": "fastuser",
+        "email": "fast@example.com",
+        "password": "fastpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "fastuser", "password": "fastpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    client.post("/api/v1/tasks/", json={"title": "Plain"}, headers=headers)
+    task = {"title": "Ünïcode ✓", "description": "line\nbreak", "completed": True}
+    client.post("/api/v1/tasks/", json=task, headers=headers)
+
+    response = client.get("/api/v1/tasks/", headers=headers)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.headers["content-type"] == "application/json"
+    for listed in response.json():
+        single = client.get(f"/api/v1/tasks/{listed['id']}", headers=headers)
+        assert listed == single.json()
+
+
+def test_export_tasks_streams_ndjson_and_csv(client: TestClient):
+    """Test that exports stream every live task in both formats"""
+    import csv
+    import io
+    import json
+
+    user_data = {
+        "username": "exportuser",
+        "email": "export@example.com",
+        "password": "exportpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "exportuser", "password": "exportpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    operations = [
+        {"op": "create", "task": {"title": f"Task {i}", "completed": i % 2 == 0}}
+        for i in range(5)
+    ]
+    operations[1]["task"]["description"] = 'Has "quotes", commas\nand newlines'
+    response = client.post(
+        "/api/v1/tasks/bulk", json={"operations": operations}, headers=headers
+    )
+    ids = [result["id"] for result in response.json()["results"]]
+    client.delete(f"/api/v1/tasks/{ids[4]}", headers=headers)
+    listed = client.get("/api/v1/tasks/", headers=headers).json()
+
+    response = client.get("/api/v1/tasks/export", headers=headers)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "tasks.ndjson" in response.headers["content-disposition"]
+    assert [json.loads(line) for line in response.text.splitlines()] == listed
+
+    response = client.get(
+        "/api/v1/tasks/export", params={"format": "csv"}, headers=headers
+    )
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row["id"]) for row in rows] == ids[:4]
+    assert rows[1]["description"] == operations[1]["task"]["description"]
+    assert [row["completed"] for row in rows] == ["true", "false", "true", "false"]
+    assert rows[0]["description"] == ""
+
+    response = client.get(
+        "/api/v1/tasks/export", params={"format": "xml"}, headers=headers
+    )
+    assert response.status_code == 422, f"Expected 422, got {response.status_code}"
+
+
+def test_import_tasks_from_upload(client: TestClient):
+    """Test CSV/NDJSON imports with per-row errors and counter upkeep"""
+    user_data = {
+        "username": "importuser",
+        "email": "import@example.com",
+        "password": "importpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "importuser", "password": "importpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    ndjson = "\n".join(
+        [
+            '{"title": "First", "completed": true}',
+            "",
+            "not json",
+            '{"description": "no title"}',
+            '{"title": "Second", "id": 999}',
+            "[1, 2]",
+        ]
+    )
+    response = client.post(
+        "/api/v1/tasks/import",
+        files={"file": ("tasks.ndjson", ndjson)},
+        headers=headers,
+    )
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    body = response.json()
+    assert (body["imported"], body["failed"]) == (2, 3)
+    assert [error["line"] for error in body["errors"]] == [3, 4, 6]
+    assert "title" in body["errors"][1]["error"]
+
+    # An export imports back cleanly, including quoted multi-line cells
+    client.put(
+        f"/api/v1/tasks/{client.get('/api/v1/tasks/', headers=headers).json()[1]['id']}",
+        json={"description": 'Multi\nline, "quoted"'},
+        headers=headers,
+    )
+    exported = client.get(
+        "/api/v1/tasks/export", params={"format": "csv"}, headers=headers
+    )
+    response = client.post(
+        "/api/v1/tasks/import",
+        files={"file": ("backup.txt", exported.content)},
+        params={"format": "csv"},
+        headers=headers,
+    )
+    assert response.json()["imported"] == 2, response.text
+
+    listed = client.get("/api/v1/tasks/", headers=headers).json()
+    assert [task["title"] for task in listed] == ["First", "Second"] * 2
+    assert listed[3]["description"] == 'Multi\nline, "quoted"'
+    assert listed[2]["completed"] is True
+    assert listed[0]["id"] != 999
+
+    stats = client.get("/api/v1/tasks/stats", headers=headers).json()
+    assert (stats["total"], stats["completed"]) == (4, 2)
+    changes = client.get(
+        "/api/v1/tasks/changes", params={"since": 0, "limit": 3}, headers=headers
+    ).json()
+    assert changes["has_more"]
+    rest = client.get(
+        "/api/v1/tasks/changes", params={"since": changes["version"]}, headers=headers
+    ).json()
+    assert len(changes["changes"]) + len(rest["changes"]) == 4
+
+
+def test_task_endpoint_query_budgets(client: TestClient, query_budget):
+    """Test that task endpoints issue a fixed number of queries"""
+    user_data = {
+        "username": "budgetuser",
+        "email": "budget@example.com",
+        "password": "budgetpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "budgetuser", "password": "budgetpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    # Batch writes must not grow with the number of rows they touch; the first
+    # request also loads the user into the auth cache
+    operations = [{"op": "create", "task": {"title": f"Task {i}"}} for i in range(20)]
+    with query_budget(3):
+        response = client.post(
+            "/api/v1/tasks/bulk", json={"operations": operations}, headers=headers
+        )
+    ids = [result["id"] for result in response.json()["results"]]
+    operations = [{"op": "delete", "id": task_id} for task_id in ids[10:]]
+    with query_budget(5):
+        client.post(
+            "/api/v1/tasks/bulk", json={"operations": operations}, headers=headers
+        )
+
+    with query_budget(2):
+        client.get("/api/v1/tasks/", headers=headers)
+    with query_budget(2):
+        client.get(f"/api/v1/tasks/{ids[0]}", headers=headers)
+    with query_budget(3):
+        client.post("/api/v1/tasks/", json={"title": "One more"}, headers=headers)
+    with query_budget(2):
+        client.put(f"/api/v1/tasks/{ids[0]}", json={"completed": True}, headers=headers)
+    with query_budget(2):
+        client.delete(f"/api/v1/tasks/{ids[1]}", headers=headers)
+    with query_budget(1):
+        client.get("/api/v1/tasks/stats", headers=headers)
+    with query_budget(2):
+        client.get("/api/v1/tasks/changes", headers=headers)
+    with query_budget(1):
+        client.get("/api/v1/tasks/search", params={"q": "Task"}, headers=headers)
+    with query_budget(1):
+        client.get("/api/v1/tasks/export", headers=headers)
+
+
+def test_query_budget_flags_lazy_owner_loads(db_session, query_budget):
+    """Test that the budget fixture catches per-row lazy loads of Task.owner"""
+    from app.models.task import Task
+    from app.models.user import User
+
+    for i in range(3):
+        owner = User(username=f"owner{i}", email=f"owner{i}@example.com")
+        owner.hashed_password = "x"
+        db_session.add(Task(title=f"Task {i}", owner=owner))
+    db_session.commit()
+    db_session.expunge_all()
+
+    tasks = db_session.query(Task).filter(Task.title.like("Task %")).all()
+    with pytest.raises(AssertionError, match="3 x SELECT users"):
+        with query_budget(10, repeat_limit=3):
+            [task.owner.username for task in tasks]
+
+
+def test_reads_go_to_replica_except_after_writes(
+    client: TestClient, monkeypatch, tmp_path
+):
+    """Test replica routing, read-your-writes pinning and primary fallback"""
+    from sqlalchemy.orm import Session
+
+    from app.core import replicas
+    from app.core.cache import TTLCache
+    from app.core.database import Base
+    from app.models.task import Task
+
+    replica_set = replicas.ReplicaSet([f"sqlite:///{tmp_path / 'replica.db'}"])
+    replica = replica_set.engines[0]
+    Base.metadata.create_all(bind=replica)
+    monkeypatch.setattr(replicas, "read_replicas", replica_set)
+    monkeypatch.setattr(replicas, "recent_writers", TTLCache(ttl=60))
+
+    user_data = {
+        "username": "replicauser",
+        "email": "replica@example.com",
+        "password": "replicapass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+    login_data = {"username": "replicauser", "password": "replicapass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    user_id = client.get("/api/v1/users/me", headers=headers).json()["id"]
+
+    # The replica holds different rows, which shows where each read went
+    with Session(replica) as db:
+        db.add(Task(title="Replica copy", owner_id=user_id))
+        db.commit()
+
+    def titles():
+        response = client.get("/api/v1/tasks/", headers=headers)
+        assert (
+            response.status_code == 200
+        ), f"Expected 200, got {response.status_code}. Response: {response.text}"
+        return [task["title"] for task in response.json()]
+
+    assert titles() == ["Replica copy"]
+
+    # The writer reads its own write from the primary
+    client.post("/api/v1/tasks/", json={"title": "Fresh write"}, headers=headers)
+    assert titles() == ["Fresh write"]
+    replicas.recent_writers.clear()
+    assert titles() == ["Replica copy"]
+
+    # A replica that is down is skipped until it passes a health check again
+    replica_set.mark_down(replica)
+    assert titles() == ["Fresh write"]
+    assert replica_set.check() == 1
+    assert titles() == ["Replica copy"]
+    replica_set.dispose()
+
+
+def test_replica_set_round_robin_and_health_checks(tmp_path):
+    """Test that replicas take turns and unreachable ones are skipped"""
+    from app.core.replicas import ReplicaSet
+
+    replica_set = ReplicaSet(
+        [
+            f"sqlite:///{tmp_path / 'a.db'}",
+            f"sqlite:///{tmp_path / 'b.db'}",
+            f"sqlite:///{tmp_path / 'missing' / 'c.db'}",
+        ]
+    )
+    first, second, unreachable = replica_set.engines
+    assert replica_set.check() == 2
+    assert [replica_set.choose() for _ in range(4)] == [first, second] * 2
+
+    # Connecting lazily also takes a failing replica out of rotation
+    replica_set.mark_up(unreachable)
+    sessions = [replica_set.session() for _ in range(3)]
+    assert [db.get_bind() for db in sessions] == [first, second, first]
+    for db in sessions:
+        db.close()
+    assert replica_set.healthy() == [first, second]
+    replica_set.dispose()
+
+
+def test_tasks_live_on_the_users_shard_and_can_move(
+    client: TestClient, db_session, monkeypatch, tmp_path
+):
+    """Test shard routing, the write freeze during moves, and moving a user"""
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+
+    from app.core import sharding
+    from app.core.cache import TTLCache
+    from app.core.config import settings
+    from app.models.task import Task
+    from app.models.user_shard import UserShard
+    from app.schemas.task import TaskCreate
+    from app.services import shard_service
+    from app.services.task_service import TasksMoved, create_task, import_tasks
+
+    shard_set = sharding.ShardSet(
+        db_session.get_bind().engine, {"east": f"sqlite:///{tmp_path / 'east.db'}"}
+    )
+    shard_set.create_schema()
+    east = shard_set.engines["east"]
+    monkeypatch.setattr(sharding, "shards", shard_set)
+    monkeypatch.setattr(shard_service, "shard_map_cache", TTLCache(ttl=60))
+    monkeypatch.setattr(settings, "SHARDS_FOR_NEW_USERS", ["east"])
+
+    user_data = {
+        "username": "sharduser",
+        "email": "shard@example.com",
+        "password": "shardpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+    login_data = {"username": "sharduser", "password": "shardpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    user_id = client.get("/api/v1/users/me", headers=headers).json()["id"]
+
+    ids = [
+        client.post("/api/v1/tasks/", json={"title": title}, headers=headers).json()[
+            "id"
+        ]
+        for title in ("Keep", "Also keep", "Drop")
+    ]
+    client.delete(f"/api/v1/tasks/{ids[2]}", headers=headers)
+
+    def owned(db):
+        return db.scalar(
+            select(func.count()).select_from(Task).where(Task.owner_id == user_id)
+        )
+
+    # Every write and read went to the user's shard, not the primary
+    with Session(east) as db:
+        assert owned(db) == 3
+    assert owned(db_session) == 0
+    response = client.get("/api/v1/tasks/", headers=headers)
+    assert [task["title"] for task in response.json()] == ["Keep", "Also keep"]
+    old_version = client.get("/api/v1/tasks/stats", headers=headers).json()["version"]
+
+    # Writes wait while a move is in progress; reads carry on
+    placement = db_session.get(UserShard, user_id)
+    placement.moving = True
+    db_session.commit()
+    shard_service.shard_map_cache.clear()
+    response = client.post("/api/v1/tasks/", json={"title": "Late"}, headers=headers)
+    assert (
+        response.status_code == 503
+    ), f"Expected 503, got {response.status_code}. Response: {response.text}"
+    assert client.get("/api/v1/tasks/", headers=headers).status_code == 200
+    placement.moving = False
+    db_session.commit()
+
+    assert shard_service.move_user(db_session, user_id, "default", 0) == 2
+    with Session(east) as db:
+        assert owned(db) == 0
+    response = client.get("/api/v1/tasks/", headers=headers)
+    assert [task["title"] for task in response.json()] == ["Keep", "Also keep"]
+    stats = client.get("/api/v1/tasks/stats", headers=headers).json()
+    assert stats["total"] == 2 and stats["version"] > old_version
+    # Deltas from before the move are gone; clients must refetch
+    response = client.get(
+        "/api/v1/tasks/changes", params={"since": old_version}, headers=headers
+    )
+    assert response.status_code == 410
+    response = client.post("/api/v1/tasks/", json={"title": "New"}, headers=headers)
+    assert response.status_code == 200
+
+    # A write that commits during the copy is caught and the copy redone
+    copy_tasks = shard_service._copy_tasks
+    late_writes = []
+
+    def copy_then_write(src, dst, user_id, batch_size):
+        copied = copy_tasks(src, dst, user_id, batch_size)
+        if not late_writes:
+            late_writes.append(create_task(src, TaskCreate(title="Late"), user_id))
+        return copied
+
+    monkeypatch.setattr(shard_service, "_copy_tasks", copy_then_write)
+    assert shard_service.move_user(db_session, user_id, "east", 0) == 4
+    assert owned(db_session) == 0
+    response = client.get("/api/v1/tasks/", headers=headers)
+    assert [task["title"] for task in response.json()] == [
+        "Keep",
+        "Also keep",
+        "New",
+        "Late",
+    ]
+
+    # An import still writing to the old shard once the move is done is
+    # refused there; what it committed earlier moved along
+    monkeypatch.setattr(shard_service, "_copy_tasks", copy_tasks)
+
+    def records():
+        yield 1, {"title": "Imported early"}, None
+        assert shard_service.move_user(db_session, user_id, "default", 0) == 5
+        yield 2, {"title": "Imported late"}, None
+
+    with Session(east) as db:
+        with pytest.raises(TasksMoved):
+            import_tasks(db, user_id, records(), batch_size=1)
+        db.rollback()
+        assert owned(db) == 0
+    response = client.get("/api/v1/tasks/", headers=headers)
+    assert [task["title"] for task in response.json()][-1] == "Imported early"
+    assert client.get("/api/v1/tasks/stats", headers=headers).json()["total"] == 5
+    shard_set.dispose()
+
+
+# tasks and task_summaries as created by releases before delta sync
+_EARLIER_SCHEMA = [
+    "CREATE TABLE tasks (id INTEGER NOT NULL PRIMARY KEY, title VARCHAR NOT NULL, "
+    "description TEXT, completed BOOLEAN, owner_id INTEGER NOT NULL, "
+    "created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME)",
+    "CREATE INDEX ix_tasks_title ON tasks (title)",
+    "CREATE INDEX ix_tasks_id ON tasks (id)",
+    "CREATE TABLE task_summaries (owner_id INTEGER NOT NULL PRIMARY KEY, "
+    "version INTEGER NOT NULL)",
+    "INSERT INTO tasks (title, description, completed, owner_id) VALUES "
+    "('Write report', 'quarterly numbers', 1, 1), "
+    "('Buy milk', NULL, 0, 1), "
+    "('Plan trip', NULL, 0, 2)",
+    # More than a page of legacy tasks, all created within the same second
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 10) "
+    "INSERT INTO tasks (title, owner_id) SELECT 'Chore ' || i, 1 FROM n",
+    "INSERT INTO task_summaries (owner_id, version) VALUES (1, 7)",
+]
+
+
+def test_upgrade_schema_from_earlier_release(tmp_path):
+    """Test tables created by an earlier release are upgraded in place"""
+    from datetime import datetime
+
+    from sqlalchemy import create_engine, inspect, select
+    from sqlalchemy.orm import Session
+
+    from app.core.database import Base
+    from app.models.task import Task
+    from app.models.task_summary import TaskSummary
+    from app.schemas.task import TaskQuery
+    from app.services.schema_service import upgrade_schema
+    from app.services.task_service import (
+        get_task_changes,
+        get_task_stats,
+        get_tasks,
+        search_tasks,
+        task_cursor,
+    )
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        for statement in _EARLIER_SCHEMA:
+            connection.exec_driver_sql(statement)
+    Base.metadata.create_all(bind=engine)
+
+    assert upgrade_schema(engine) == [
+        "tasks.deleted_at",
+        "tasks.version",
+        "task_summaries.purged_version",
+        "tasks.created_at",
+        "tasks.updated_at",
+        "task_summaries.total",
+        "task_summaries.completed",
+        "task_summaries.moved_to",
+        "ix_tasks_owner_completed_created_id",
+        "ix_tasks_owner_created_id",
+        "ix_tasks_owner_updated_id",
+        "ix_tasks_owner_version",
+        "tasks_fts",
+    ]
+    columns = {column["name"] for column in inspect(engine).get_columns("tasks")}
+    assert {"deleted_at", "version"} <= columns
+
+    with Session(engine) as db:
+        rows = db.execute(select(TaskSummary.owner_id, TaskSummary.version)).all()
+        versions = dict(rows)
+        # Existing tasks get versions after every one clients may have synced
+        # from, one each so delta sync can page through them
+        assert versions == {1: 19, 2: 1}
+        synced, since, has_more = [], 7, True
+        while has_more:
+            tasks, since, has_more = get_task_changes(db, 1, since, limit=5)
+            synced += [task.title for task in tasks]
+        assert synced[:2] == ["Write report", "Buy milk"]
+        assert len(synced) == 12 and since == 19
+        # Keyset cursors page through legacy rows created within one second
+        listed, cursor = [], None
+        while page := get_tasks(db, 1, limit=5, cursor=cursor):
+            listed += [task.id for task in page]
+            cursor = task_cursor(page[-1])
+        assert listed == [1, 2] + list(range(4, 14))
+        # Legacy tasks were last updated when created
+        recent = TaskQuery(updated_since=datetime(2000, 1, 1), order_by="updated_at")
+        listed, cursor = [], None
+        while page := get_tasks(db, 1, limit=5, cursor=cursor, filters=recent):
+            listed += [task.id for task in page]
+            cursor = task_cursor(page[-1], recent)
+        assert listed == [1, 2] + list(range(4, 14))
+        assert all(task.deleted_at is None for task in db.scalars(select(Task)))
+        # Counters are seeded from the existing tasks
+        assert get_task_stats(db, 1) == {
+            "total": 12,
+            "completed": 1,
+            "pending": 11,
+            "version": 19,
+        }
+        assert get_task_stats(db, 2)["total"] == 1
+        # Existing tasks are searchable, and new ones are indexed by triggers
+        matches = search_tasks(db, 1, "quarterly")
+        assert [task.title for task, _ in matches] == ["Write report"]
+        db.add(Task(title="Quarterly review", owner_id=1))
+        db.commit()
+        assert len(search_tasks(db, 1, "quarterly")) == 2
+
+    # Upgrading again changes nothing
+    assert upgrade_schema(engine) == []
+    engine.dispose()
@@ -1,3 +1,4 @@
+import pytest
 from fastapi.testclient import TestClient
 
 
@@ -114,3 +115,312 @@ def test_password_hashing():
 
     assert verify_password(password, hashed)
     assert not verify_password("wrongpassword", hashed)
+
+
+def test_current_user_served_from_cache(client: TestClient, monkeypatch):
+    """Test that repeat requests skip the users lookup"""
+    user_data = {
+        "username": "cacheduser",
+        "email": "cached@example.com",
+        "password": "testpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "cacheduser", "password": "testpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+
+    def fail_lookup(db, username):
+        raise AssertionError("user lookup should be served from cache")
+
+    monkeypatch.setattr("app.api.dependencies.get_user_by_username", fail_lookup)
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["username"] == "cacheduser"
+
+
+def test_deactivated_user_invalidates_cache(client: TestClient, db_session):
+    """Test that deactivating a user evicts the cached identity"""
+    from app.models.user import User
+
+    user_data = {
+        "username": "deactivateduser",
+        "email": "deactivated@example.com",
+        "password": "testpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "deactivateduser", "password": "testpass123"}
+    login_response = client.post("/api/v1/users/login", params=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+
+    user = db_session.query(User).filter(User.username == "deactivateduser").one()
+    user.is_active = False
+    db_session.commit()
+
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 403
+
+
+def test_redis_cache_round_trip():
+    """Test the Redis-backed cache against an in-memory stand-in"""
+    from app.core.cache import RedisCache
+
+    class FakeRedis:
+        def __init__(self):
+            self.store = {}
+
+        def get(self, key):
+            return self.store.get(key)
+
+        def set(self, key, value, ex=None):
+            self.store[key] = value
+
+        def delete(self, key):
+            self.store.pop(key, None)
+
+        def scan_iter(self, match):
+            return [key for key in list(self.store) if key.startswith(match[:-1])]
+
+    cache = RedisCache(FakeRedis(), ttl=30, prefix="user:")
+    cache.set("alice", {"id": 1, "username": "alice"})
+    assert cache.get("alice") == {"id": 1, "username": "alice"}
+    cache.delete("alice")
+    assert cache.get("alice") is None
+    cache.set("bob", {"id": 2})
+    cache.clear()
+    assert cache.get("bob") is None
+
+
+def test_login_rehashes_outdated_password(client: TestClient, db_session):
+    """Test that a hash made with an old cost factor is upgraded on login"""
+    from app.core.security import pwd_context
+    from app.models.user import User
+
+    user_data = {
+        "username": "rehashuser",
+        "email": "rehash@example.com",
+        "password": "testpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    user = db_session.query(User).filter(User.username == "rehashuser").one()
+    user.hashed_password = pwd_context.handler().using(rounds=4).hash("testpass123")
+    db_session.commit()
+    assert pwd_context.needs_update(user.hashed_password)
+
+    login_data = {"username": "rehashuser", "password": "testpass123"}
+    response = client.post("/api/v1/users/login", params=login_data)
+    assert response.status_code == 200, f"Login failed: {response.text}"
+
+    db_session.refresh(user)
+    assert not pwd_context.needs_update(user.hashed_password)
+    assert pwd_context.verify("testpass123", user.hashed_password)
+
+
+def test_login_shed_when_hash_queue_full(client: TestClient, monkeypatch):
+    """Test that logins get 503 once the bcrypt queue is saturated"""
+    import threading
+
+    exhausted = threading.BoundedSemaphore(1)
+    exhausted.acquire()
+    monkeypatch.setattr("app.core.security._hash_slots", exhausted)
+
+    user_data = {
+        "username": "shedpwuser",
+        "email": "shedpw@example.com",
+        "password": "testpass123",
+    }
+    response = client.post("/api/v1/users/register", json=user_data)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_task_endpoints_served_while_hash_queue_full(client, monkeypatch):
+    """Test that logins waiting on bcrypt hold no request threadpool threads"""
+    import asyncio
+    import threading
+
+    import anyio
+    from httpx import AsyncClient
+
+    from app.core import security
+    from app.main import app
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user_data = {
+            "username": "stormuser",
+            "email": "storm@example.com",
+            "password": "testpass123",
+        }
+        await ac.post("/api/v1/users/register", json=user_data)
+        login_data = {"username": "stormuser", "password": "testpass123"}
+        response = await ac.post("/api/v1/users/login", params=login_data)
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        # Far more bcrypt slots than request threads: sync handlers parked on
+        # bcrypt would leave none for the task endpoints
+        slots = 6
+        monkeypatch.setattr(security, "_hash_slots", threading.BoundedSemaphore(slots))
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        monkeypatch.setattr(limiter, "total_tokens", 2)
+        release = threading.Event()
+
+        def blocked_verify(*args):
+            release.wait(timeout=10)
+            return False, None
+
+        monkeypatch.setattr(security.pwd_context, "verify_and_update", blocked_verify)
+
+        async def hash_jobs(count):
+            while security._hash_slots._value > slots - count:
+                await asyncio.sleep(0.01)
+
+        storm = {"username": "stormuser", "password": "wrongpass123"}
+        logins = []
+        try:
+            for count in range(1, slots + 1):
+                logins.append(
+                    asyncio.create_task(ac.post("/api/v1/users/login", params=storm))
+                )
+                # One at a time, so their user lookups don't share the session
+                await asyncio.wait_for(hash_jobs(count), timeout=5)
+
+            response = await asyncio.wait_for(
+                ac.get("/api/v1/tasks/", headers=headers), timeout=5
+            )
+            assert response.status_code == 200
+            response = await ac.post("/api/v1/users/login", params=storm)
+            assert response.status_code == 503
+        finally:
+            release.set()
+        responses = await asyncio.gather(*logins)
+        assert [response.status_code for response in responses] == [401] * slots
+
+
+def test_user_registration_duplicate_email(client: TestClient, monkeypatch):
+    """Test registration with a taken email and no password verification"""
+    user_data = {
+        "username": "emailowner",
+        "email": "taken@example.com",
+        "password": "testpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    async def fail_verify(*args):
+        raise AssertionError("registration must not verify passwords")
+
+    monkeypatch.setattr(
+        "app.services.user_service.averify_and_update_password", fail_verify
+    )
+    duplicate = {**user_data, "username": "emailthief"}
+    response = client.post("/api/v1/users/register", json=duplicate)
+    assert (
+        response.status_code == 400
+    ), f"Expected 400, got {response.status_code}. Response: {response.text}"
+    assert response.json()["detail"] == "Email already registered"
+
+
+def test_refresh_rotates_tokens_without_password_check(client: TestClient, monkeypatch):
+    """Test that a refresh token renews the session and is single-use"""
+    user_data = {
+        "username": "refreshuser",
+        "email": "refresh@example.com",
+        "password": "testpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "refreshuser", "password": "testpass123"}
+    tokens = client.post("/api/v1/users/login", params=login_data).json()
+    assert tokens["refresh_token"]
+    assert tokens["expires_in"] > 0
+
+    def fail_hash_job(*args):
+        raise AssertionError("refreshing must not run bcrypt")
+
+    monkeypatch.setattr("app.core.security._submit_hash_job", fail_hash_job)
+    response = client.post(
+        "/api/v1/users/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert (
+        response.status_code == 200
+    ), f"Expected 200, got {response.status_code}. Response: {response.text}"
+    renewed = response.json()
+    assert renewed["refresh_token"] != tokens["refresh_token"]
+    headers = {"Authorization": f"Bearer {renewed['access_token']}"}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+
+    response = client.post(
+        "/api/v1/users/refresh", json={"refresh_token": "not-a-real-token"}
+    )
+    assert response.status_code == 401
+
+
+def test_refresh_token_reuse_revokes_session(client: TestClient):
+    """Test that replaying a consumed refresh token ends the whole session"""
+    user_data = {
+        "username": "reuseuser",
+        "email": "reuse@example.com",
+        "password": "testpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "reuseuser", "password": "testpass123"}
+    stolen = client.post("/api/v1/users/login", params=login_data).json()
+    renewed = client.post(
+        "/api/v1/users/refresh", json={"refresh_token": stolen["refresh_token"]}
+    ).json()
+
+    response = client.post(
+        "/api/v1/users/refresh", json={"refresh_token": stolen["refresh_token"]}
+    )
+    assert response.status_code == 401
+    # The legitimate holder's newer tokens die with the session
+    response = client.post(
+        "/api/v1/users/refresh", json={"refresh_token": renewed["refresh_token"]}
+    )
+    assert response.status_code == 401
+    headers = {"Authorization": f"Bearer {renewed['access_token']}"}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 401
+
+
+def test_logout_revokes_access_token(client: TestClient, db_session):
+    """Test that logout rejects the session's tokens here and on other workers"""
+    from app.core.revocation import revoked_sessions
+    from app.services.token_service import sync_revocations
+
+    user_data = {
+        "username": "logoutuser",
+        "email": "logout@example.com",
+        "password": "testpass123",
+    }
+    client.post("/api/v1/users/register", json=user_data)
+
+    login_data = {"username": "logoutuser", "password": "testpass123"}
+    ended = client.post("/api/v1/users/login", params=login_data).json()
+    other = client.post("/api/v1/users/login", params=login_data).json()
+    headers = {"Authorization": f"Bearer {ended['access_token']}"}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+
+    response = client.post("/api/v1/users/logout", headers=headers)
+    assert (
+        response.status_code == 200
+    ), f"Expected 200, got {response.status_code}. Response: {response.text}"
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 401
+    response = client.post(
+        "/api/v1/users/refresh", json={"refresh_token": ended["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+    # Another worker learns about the logout from the database
+    revoked_sessions.clear()
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    assert sync_revocations(db_session) == 1
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 401
+
+    # Other sessions of the same user are unaffected
+    headers = {"Authorization": f"Bearer {other['access_token']}"}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
@@ -0,0 +1,58 @@
+"""Fixtures for the pytest-benchmark microbenchmarks.
+
+Run from ``backend/``::
+
+    python -m pytest benchmarks --no-cov --benchmark-json=benchmarks.json
+"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import pytest  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.core.database import Base  # noqa: E402
+from app.models.task import Task  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+SEEDED_TASKS = 1000
+
+
+@pytest.fixture(scope="session")
+def session_factory():
+    """In-memory database with one user owning SEEDED_TASKS tasks."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(
+            Task(
+                title=f"Task {i}",
+                description="Lorem ipsum dolor sit amet " * 4,
+                completed=i % 3 == 0,
+                owner_id=user.id,
+            )
+            for i in range(SEEDED_TASKS)
+        )
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
+
+
+@pytest.fixture(scope="session")
+def user_id(session_factory):
+    with session_factory() as session:
+        return session.query(User.id).filter(User.username == "bench").scalar()
@@ -0,0 +1,91 @@
+"""Per-request CPU cost of serializing a task listing page.
+
+Compares the ORM path (load ``Task`` objects, validate them through
+``List[TaskResponse]``, encode with the standard library) against the
+column-select path ``read_tasks`` uses (plain rows, ``_asdict()``, orjson).
+
+Run from ``backend/``::
+
+    python -m benchmarks.task_serialization --tasks 100 --rounds 200
+"""
+import argparse
+import json
+import os
+import timeit
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.api.responses import FastJSONResponse  # noqa: E402
+from app.core.database import Base  # noqa: E402
+from app.models.task import Task  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.task import TaskResponse  # noqa: E402
+from app.services.task_service import get_task_rows, get_tasks  # noqa: E402
+
+task_list = TypeAdapter(List[TaskResponse])
+
+
+def model_path(db, user_id: int, limit: int) -> bytes:
+    # What FastAPI does for a response_model: validate, dump, json.dumps
+    tasks = get_tasks(db, user_id=user_id, limit=limit)
+    content = task_list.dump_python(
+        task_list.validate_python(tasks, from_attributes=True), mode="json"
+    )
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def row_path(db, user_id: int, limit: int) -> bytes:
+    rows = get_task_rows(db, user_id=user_id, limit=limit)
+    return FastJSONResponse([row._asdict() for row in rows]).body
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100, help="page size")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(
+            Task(
+                title=f"Task {i}",
+                description="Lorem ipsum dolor sit amet " * 4,
+                completed=i % 3 == 0,
+                owner_id=user.id,
+            )
+            for i in range(args.tasks)
+        )
+        db.commit()
+        user_id = user.id
+
+    results = {}
+    for name, path in (("orm+pydantic+json", model_path), ("rows+orjson", row_path)):
+        # A fresh session per request, as in the app
+        def request():
+            with Session() as db:
+                path(db, user_id, args.tasks)
+
+        request()  # warm up
+        best = min(timeit.repeat(request, number=args.rounds, repeat=3))
+        results[name] = best / args.rounds * 1e6
+        print(f"{name:<20} {results[name]:9.1f} us/request")
+    baseline, fast = results.values()
+    print(f"{'speedup':<20} {baseline / fast:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
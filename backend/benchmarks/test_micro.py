@@ -0,0 +1,48 @@
+"""Microbenchmarks of the per-request hot paths."""
+import pytest
+
+from app.core import security
+from app.core.security import create_access_token, token_cache, verify_token
+from app.services.task_service import get_task_rows, get_tasks
+from benchmarks.task_serialization import model_path, row_path
+
+
+def test_create_access_token(benchmark):
+    token = benchmark(create_access_token, {"sub": "bench"})
+    assert token
+
+
+def test_verify_token_cached(benchmark):
+    token = create_access_token({"sub": "bench"})
+    verify_token(token)
+    assert benchmark(verify_token, token) == "bench"
+
+
+@pytest.mark.parametrize("backend", sorted(security.JWT_BACKENDS))
+def test_verify_token_uncached(benchmark, monkeypatch, backend):
+    if backend == "pyjwt":
+        pytest.importorskip("jwt")
+    monkeypatch.setattr(security, "jwt_backend", security.JWT_BACKENDS[backend]())
+    token = create_access_token({"sub": "bench"})
+    result = benchmark.pedantic(
+        verify_token, (token,), setup=token_cache.clear, rounds=2000
+    )
+    assert result == "bench"
+
+
+@pytest.mark.parametrize("limit", [20, 100])
+def test_get_tasks(benchmark, db, user_id, limit):
+    tasks = benchmark(get_tasks, db, user_id=user_id, limit=limit)
+    assert len(tasks) == limit
+
+
+@pytest.mark.parametrize("limit", [20, 100])
+def test_get_task_rows(benchmark, db, user_id, limit):
+    rows = benchmark(get_task_rows, db, user_id=user_id, limit=limit)
+    assert len(rows) == limit
+
+
+@pytest.mark.parametrize("path", [model_path, row_path], ids=["model", "rows"])
+def test_serialize_task_page(benchmark, db, user_id, path):
+    body = benchmark(path, db, user_id, 100)
+    assert body.startswith(b"[{")
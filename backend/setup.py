@@ -7,6 +7,7 @@ setup(
     install_requires=[
         "fastapi==0.104.1",
         "uvicorn[standard]==0.24.0",
+        "orjson==3.9.10",
         "sqlalchemy==2.0.23",
         "psycopg2-binary==2.9.9",
         "python-jose[cryptography]==3.3.0",